@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+""" Simulator checkpoints: the whole state of a simulation (clock, memory controller with its
+	bank/rank state, queues, FIFO, dataQ and refresh counters, and the cores with their trace
+	positions and counters) is pickled into one file so a run can be resumed from it, or several
+	runs can continue from the same warmed-up state.
+
+	File layout: two pickles, the configuration the checkpoint was taken with (a dict, readable
+	without the simulator) followed by the simulator state. Traces are stored by path and loaded
+	again through TraceCache on restore; generated streams (TraceGen) are stored with their
+	generator state and go on where they left off.
+
+	Usage: ./Checkpoint.py ckpt [ckpt ...]   (print the configuration of the checkpoints) """
+
+import os
+import sys
+import cPickle
+
+__metaclass__ = type
+
+VERSION = 2
+
+
+# write the configuration and the state (any picklable object graph) to path
+def save(path, config, state):
+	tmp_path = path + '.%d' % os.getpid()
+	out_file = open(tmp_path, 'wb')
+	cPickle.dump(dict(config, version=VERSION), out_file, cPickle.HIGHEST_PROTOCOL)
+	cPickle.dump(state, out_file, cPickle.HIGHEST_PROTOCOL)
+	out_file.close()
+	os.rename(tmp_path, path)	#atomic so a crash never leaves a partial checkpoint
+
+
+# read only the configuration of the checkpoint at path
+def load_config(path):
+	in_file = open(path, 'rb')
+	config = cPickle.load(in_file)
+	in_file.close()
+
+	if config.get('version') != VERSION:
+		raise ValueError("Unsupported checkpoint version in " + path)
+	return config
+
+
+# return (config, state) of the checkpoint at path
+def load(path):
+	in_file = open(path, 'rb')
+	config = cPickle.load(in_file)
+	if config.get('version') != VERSION:
+		in_file.close()
+		raise ValueError("Unsupported checkpoint version in " + path)
+
+	state = cPickle.load(in_file)
+	in_file.close()
+	return config, state
+
+
+def main():
+	for path in sys.argv[1:]:
+		config = load_config(path)
+		print path + ": " + " ".join("%s=%s" % (key, config[key]) for key in sorted(config))
+
+
+if __name__ == '__main__': main()
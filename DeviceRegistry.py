@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+""" Device registry: parses every timing file in devices/ once and hands out immutable device
+	objects with all derived constraints (tRTW, tBUS, tRTR, ...) precomputed for a RL/WL pair.
+	The parsed constraints of all devices are kept in a single cache file (devices/devices.cache)
+	that is rebuilt whenever a device file changes. All units are nano-seconds.
+
+	Usage: ./DeviceRegistry.py   (rebuild the cache and list the devices) """
+
+import os
+import re
+import glob
+import cPickle
+from collections import namedtuple
+
+__metaclass__ = type
+
+DEVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'devices')
+CACHE_FILE = os.path.join(DEVICE_DIR, 'devices.cache')
+
+# constraints in the order they must appear in a device file
+PARAMS = ('tRCD', 'tRP', 'tRC', 'tRAS', 'tRTP', 'tWR', 'tWTR', 'tRRD1', 'tRRD2', 'tFAW1', 'tFAW2', 'tCK')
+
+# all constraints of a device for one RL/WL pair
+Device = namedtuple('Device', ('name',) + PARAMS + ('tFAW', 'tRRD', 'tRTW', 'tRL', 'tWL', 'tBUS', 'tCCD', 'tREF', 'tRFC', 'tRTR'))
+
+_params = None		#device name -> tuple of constraints in PARAMS order
+_devices = {}		#(device name or path, RL, WL) -> Device
+
+
+# read the constraints of a single device file
+def parse_file(path):
+	time_param = []
+	in_file = open(path, 'r')
+
+	# Loop until EOF or an empty line has been reached
+	for input_line in in_file:
+		if input_line == '\n':
+			break
+
+		# Get the time constraints and added to list
+		time_param.append(float(re.split(' ', input_line)[2]))
+	in_file.close()
+
+	# Make sure all timing constraints are in the input file
+	if len(time_param) != len(PARAMS):
+		raise ValueError("Missing timing constraints in input device file " + path)
+
+	return tuple(time_param)
+
+
+# name of the device, i.e. the file name without .txt
+def device_name(path):
+	return os.path.splitext(os.path.basename(path))[0]
+
+
+# load the constraints of all devices, from the cache if it is still up to date
+def load_all():
+	global _params
+
+	if _params is not None:
+		return _params
+
+	files = sorted(glob.glob(os.path.join(DEVICE_DIR, '*.txt')))
+	mtimes = dict((device_name(f), os.stat(f).st_mtime) for f in files)
+
+	try:
+		cache_file = open(CACHE_FILE, 'rb')
+		cached_mtimes, params = cPickle.load(cache_file)
+		cache_file.close()
+		if cached_mtimes == mtimes:
+			_params = params
+			return _params
+	except (IOError, EOFError, ValueError, cPickle.UnpicklingError):
+		pass
+
+	_params = dict((device_name(f), parse_file(f)) for f in files)
+
+	try:
+		tmp_name = CACHE_FILE + '.%d' % os.getpid()
+		cache_file = open(tmp_name, 'wb')
+		cPickle.dump((mtimes, _params), cache_file, cPickle.HIGHEST_PROTOCOL)
+		cache_file.close()
+		os.rename(tmp_name, CACHE_FILE)	#atomic so parallel runs never see a partial cache
+	except (IOError, OSError):
+		pass	#read-only checkout, parse again next time
+
+	return _params
+
+
+# names of all the devices in the registry
+def names():
+	return sorted(load_all().keys())
+
+
+# build a Device from its constraints and RL/WL (in cycles)
+def make_device(name, param, RL, WL):
+	p = dict(zip(PARAMS, param))
+	tCK = p['tCK']
+	return Device(name=name,
+			tFAW=p['tFAW1'],
+			tRRD=p['tRRD1'],
+			tRTW=(6 + (RL - WL)) * tCK,
+			tRL=RL * tCK,
+			tWL=WL * tCK,
+			tBUS=4 * tCK,
+			tCCD=4 * tCK,
+			tREF=7800,
+			tRFC=160,
+			tRTR=2 * tCK,
+			**p)
+
+
+# return the Device for a device name (e.g. DDR3-1333H) or timing file path, and RL/WL in cycles
+def get_device(device, RL, WL):
+	key = (device, RL, WL)
+	if key in _devices:
+		return _devices[key]
+
+	name = device_name(device)
+
+	# a timing file outside devices/ is parsed on its own
+	if os.path.exists(device) and os.path.dirname(os.path.abspath(device)) != DEVICE_DIR:
+		param = parse_file(device)
+	elif name in load_all():
+		param = _params[name]
+	else:
+		raise ValueError("Unknown device " + device)
+
+	_devices[key] = make_device(name, param, RL, WL)
+	return _devices[key]
+
+
+def main():
+	for name in names():
+		print name + ": " + " ".join("%s=%g" % (p, v) for p, v in zip(PARAMS, _params[name]))
+
+
+if __name__ == '__main__': main()
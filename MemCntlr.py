@@ -1,73 +1,82 @@
 #!/usr/bin/env python
-""" Memory Controller: All timing are done in absolute time (i.e. nano-seconds) instead of cycles"""
-import re
+""" Memory Controller: All timing are done in absolute time instead of cycles. Time is kept as integer
+	pico-seconds so every compare is exact; convert to nano-seconds only when reporting results."""
+import sys
 from math import *
+from operator import attrgetter
 from collections import deque
+import DeviceRegistry
+
+try:
+	import numpy
+except ImportError:
+	numpy = None	#only needed to map a whole trace at once (MemConfig.map_trace)
+
+__metaclass__ = type
+
+PS_PER_NS = 1000
+NEVER = sys.maxint	#integer deadline of a command that is held until it is reset (a rank in refresh)
+
+# convert a time in nano-seconds to integer pico-second ticks
+def to_ticks(ns):
+	return int(round(ns * PS_PER_NS))
+
+# convert integer pico-second ticks back to nano-seconds for reporting
+def to_ns(ticks):
+	return float(ticks) / PS_PER_NS
+
+# request types (Request.memType); trace parsers convert to these once at load time
+REQ_READ = 0
+REQ_WRITE = 1
+REQ_NAME = ("READ", "WRITE")
+
+# command opcodes (Command.cmdType)
+CMD_PRE = 0
+CMD_ACT = 1
+CMD_RD = 2
+CMD_WR = 3
+CMD_NAME = ("PRE", "ACT", "RD", "WR")
+
+# per opcode tables, indexed by cmdType
+IS_CAS = (False, False, True, True)
+CAS_CMD = (CMD_RD, CMD_WR)	#indexed by memType
+BANK_DEADLINE = (attrgetter('nextPRE'), attrgetter('nextACT'), attrgetter('nextRD'), attrgetter('nextWR'))
+RANK_DEADLINE = (lambda ranks, r: 0,	#no rank constraint for PRE
+		lambda ranks, r: ranks.rank[r].nextACT,
+		lambda ranks, r: max(ranks.rank[r].nextRD, ranks.other_RD.get(r)),
+		lambda ranks, r: max(ranks.rank[r].nextWR, ranks.other_WR.get(r)))
+
+# commands needed in front of the CAS for each row state
+ROW_CMDS = {"CLOSED": (CMD_PRE, CMD_ACT), "OPEN": (), "EMPTY": (CMD_ACT,)}
+
+# convert the type string of a trace line to a request type
+def req_type(name):
+	return REQ_READ if name == "READ" else REQ_WRITE
 
 # TODO: global Clock or make clock object and include it as reference in the classes that needs it
 class Clock:
 
 	def __init__(self):
-		self.time = 0
+		self.time = 0	#pico-second
 
 
-# Memory Device contains all timing constraints
+# Memory Device contains all timing constraints, in pico-seconds
 class MemDevice:
 
 	def __init__(self, newFile, RL, WL):
 		self.File = newFile
-		self.tRL = RL
-		self.tWL = WL
-		self.__get_timing()
+		device = DeviceRegistry.get_device(newFile.name, RL, WL)
 
-	def __get_timing(self):
-		input_line = [0]
-		in_file = self.File
-		time_param = []
+		# the registry keeps the constraints in ns, convert all of them to ticks
+		for name in DeviceRegistry.Device._fields[1:]:
+			setattr(self, name, to_ticks(getattr(device, name)))
+		self.name = device.name
 
-		# Loop until EOF has been reached
-		while True:
-
-			# Read the next input line from the input trace
-			input_line[0] = in_file.readline()
-
-			# EOF reached?
-			if input_line[0] == "" or input_line[0] =='\n':
-				break
-
-			# Get the time constraints and added to list
-			constraint = float(re.split(' ', input_line[0])[2])
-			time_param.append(constraint)
-
-		# Make sure all timing constraints are in the input file
-		if time_param.__len__() != 12:
-			print "Missing timing constraints in input device file"
-			exit(0)
-
-		
-		# All units in nano-seconds, the device file must put constraints in this order
-		self.tRCD = time_param[0]
-		self.tRP = time_param[1]
-		self.tRC = time_param[2]
-		self.tRAS = time_param[3]
-		self.tRTP = time_param[4]
-		self.tWR = time_param[5]
-		self.tWTR = time_param[6]
-		self.tRRD1 = time_param[7]
-		self.tRRD2 = time_param[8]
-		self.tFAW1 = time_param[9]
-		self.tFAW2 = time_param[10]
-		self.tCK = time_param[11]
-		self.tFAW = self.tFAW1
-		self.tRRD = self.tRRD1
-		self.tRTW = (6 + (self.tRL - self.tWL)) * self.tCK
-		self.tRL *= self.tCK
-		self.tWL *= self.tCK
-		self.tBUS = 4 * self.tCK
-		self.tCCD = 4 * self.tCK
-		self.tREF = 7800	#nano-second
-		self.tRFC = 160		#nano-second
-		self.tRTR = 2 * self.tCK
+	# the timing file is not part of a checkpoint, all its constraints already are
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state['File'] = None
+		return state
 
 
 # Object for data which is returned for both read and write (for ACK); no actual data is returned
@@ -88,15 +97,18 @@ class Request:
 		self.rank = 0
 		self.bank = 0
 		self.row = 0
+		self.mapped = False	#rank/bank/row already set from a premapped trace
+		self.arrival = 0	#time the request reached the controller
 
 	# overload print function
 	def __str__(self):
-		tmp_str = "core" + str(self.coreID) + ": " + self.memType + " " + str(self.addr) 
+		tmp_str = "core" + str(self.coreID) + ": " + REQ_NAME[self.memType] + " " + str(self.addr) 
 		return tmp_str
 
 
 # Object for memory commands
 class Command:
+	arrival = None	#set on the last CAS of a request: time the request reached the controller
 
 	def __init__(self, cmdType, req):
 		self.coreID = req.coreID
@@ -107,7 +119,7 @@ class Command:
 
 	# overload print function
 	def __str__(self):
-		tmp_str = "core" + str(self.coreID) + ": " + self.cmdType
+		tmp_str = "core" + str(self.coreID) + ": " + CMD_NAME[self.cmdType]
 		return tmp_str
 
 
@@ -115,59 +127,63 @@ class Command:
 #MemConfig: input Request, return Request w/ updated params
 class MemConfig:
 
-	def __init__(self, config, numBank):
+	# row (mask, shift) of each configuration; statically partition banks but map row same as WCET calc.
+	ROW_MAP = {
+		0: (0x07ffe000, 13),	# SSBB BRRR RRRR RRRR RRRC CCCC CCCC COOO
+		1: (0x3fff0000, 16),	# SSRR RRRR RRRR RRRR BBBC CCCC CCCC COOO
+	}
+
+	# channels are interleaved on the address bits from channelShift up (default one 64 byte line per channel)
+	def __init__(self, config, numBank, numChannel=1, channelShift=6):
 		self.config = config
 		self.bank_per_rank = numBank
+		self.row_mask, self.row_shift = self.ROW_MAP[config]
+		self.num_channel = numChannel
+		self.channel_shift = channelShift
 
-	def get_target(self, request):
-		# statically partition banks but map row same as WCET calc.
-		if self.config == 0:
-			""" SSBB BRRR RRRR RRRR RRRC CCCC CCCC COOO """
-			row_mask = 0x07ffe000; row_shift = 13
-
-		elif self.config == 1:
-			""" SSRR RRRR RRRR RRRR BBBC CCCC CCCC COOO """
-			row_mask = 0x3fff0000; row_shift = 16
+	# channel an address belongs to
+	def get_channel(self, addr):
+		return (addr >> self.channel_shift) % self.num_channel
 
+	def get_target(self, request):
 		# basically map bank for each core; other mappings can be added in future
-		rank = int(request.coreID/self.bank_per_rank)
-		bank = request.coreID % self.bank_per_rank
-		row = (request.addr & row_mask) >> row_shift
-
-		request.rank = rank
-		request.bank = bank
-		request.row = row
+		request.rank = int(request.coreID/self.bank_per_rank)
+		request.bank = request.coreID % self.bank_per_rank
+		request.row = (request.addr & self.row_mask) >> self.row_shift
 
 		return request
 
+	# map a whole trace of one core at once; addr is a numpy array, returns rank, bank and row arrays
+	def map_trace(self, addr, coreID):
+		addr = numpy.asarray(addr, dtype=numpy.uint64)
+		rank = numpy.full(addr.shape, int(coreID/self.bank_per_rank), dtype=numpy.int64)
+		bank = numpy.full(addr.shape, coreID % self.bank_per_rank, dtype=numpy.int64)
+		row = ((addr & numpy.uint64(self.row_mask)) >> numpy.uint64(self.row_shift)).astype(numpy.int64)
+		return rank, bank, row
 
 
-# Bank Object
-class MemBank:
-
-	# use a dictionary for constructor to avoid having many getters and setters
-	def __init__(self, **kvarg):
-		self._members = kvarg
 
-	def set(self, key, value):
-		self._members[key] = value
+# Bank Object: fixed slots so the hot loop can use direct attribute access
+class MemBank:
+	__slots__ = ('nextRD', 'nextWR', 'nextACT', 'nextPRE', 'openROW')
 
-	def get(self, key):
-		return self._members.get(key,None)
+	def __init__(self):
+		self.nextRD = 0
+		self.nextWR = 0
+		self.nextACT = 0
+		self.nextPRE = 0
+		self.openROW = -1
 
 
-# Rank Object
+# Rank Object: fixed slots so the hot loop can use direct attribute access
 class MemRank:
+	__slots__ = ('numACT', 'nextACT', 'nextRD', 'nextWR')
 
-	# use a dictionary for constructor to avoid having many getters and setters
-	def __init__(self, **kvarg):
-		self._members = kvarg
-
-	def set(self, key, value):
-		self._members[key] = value
-
-	def get(self, key):
-		return self._members.get(key,None)
+	def __init__(self):
+		self.numACT = 0
+		self.nextACT = 0
+		self.nextRD = 0
+		self.nextWR = 0
 
 
 # An array of bank objects to manage all their states
@@ -177,20 +193,20 @@ class BankState:
 		self.bank_per_rank = numBank
 		self.bank = []
 		for i in xrange(numRank*numBank):
-			self.bank.append(MemBank(nextRD=0, nextWR=0, nextACT=0, nextPRE=0, openROW=-1))
+			self.bank.append(MemBank())
 
 	# check whether the req target open or closed row and update to req row
 	def row_state(self,req):
-		idx = req.rank * self.bank_per_rank + req.bank
-		row_open = self.bank[idx].get('openROW')
+		bank = self.bank[req.rank * self.bank_per_rank + req.bank]
+		row_open = bank.openROW
 
 		if row_open == req.row:
 			return "OPEN"
 		elif row_open == -1:
-			self.bank[idx].set('openROW', req.row)
+			bank.openROW = req.row
 			return "EMPTY"
 		else:
-			self.bank[idx].set('openROW', req.row)
+			bank.openROW = req.row
 			return "CLOSED"
 
 	# return the state of entire bank object
@@ -198,15 +214,46 @@ class BankState:
 		idx = cmd.rank * self.bank_per_rank + cmd.bank
 		return self.bank[idx]
 
-	# reset all timing constraints (i.e after refresh)
-	def reset_timing(self):
-		for bank in self.bank:
-			bank.set('nextACT', 0)
-			bank.set('nextRD', 0)
-			bank.set('nextWR', 0)
-			bank.set('nextPRE', 0)
+	# reset all timing constraints (i.e after refresh), of all ranks or of one
+	def reset_timing(self, rank=None):
+		banks = self.bank if rank is None else self.bank[rank*self.bank_per_rank:(rank+1)*self.bank_per_rank]
+		for bank in banks:
+			bank.nextACT = 0
+			bank.nextRD = 0
+			bank.nextWR = 0
+			bank.nextPRE = 0
+
 
 
+# Cross rank constraint (tRTR) shared by all ranks: keeps the largest constraint set by a CAS
+# and the largest one set by a CAS on any other rank, so a rank reads the constraint that
+# applies to it without every CAS updating all the other ranks
+class OtherRank:
+	__slots__ = ('first', 'rank', 'second')
+
+	def __init__(self):
+		self.reset()
+
+	def reset(self):
+		self.first = 0		#largest constraint
+		self.rank = -1		#rank whose CAS set the largest constraint
+		self.second = 0		#largest constraint set by a CAS not on self.rank
+
+	# a CAS on rank constrains all the other ranks until time
+	def update(self, rank, time):
+		if rank == self.rank:
+			self.first = max(self.first, time)
+		elif time > self.first:
+			self.second = self.first
+			self.first = time
+			self.rank = rank
+		else:
+			self.second = max(self.second, time)
+
+	# constraint that applies to rank
+	def get(self, rank):
+		return self.second if rank == self.rank else self.first
+
 
 # An array of rank objects to manage all their states
 class RankState:
@@ -214,38 +261,90 @@ class RankState:
 	def __init__(self, numRank):
 		self.rank = []
 		for i in xrange(numRank):
-			self.rank.append(MemRank(numACT=0, nextACT=0, nextRD=0, nextWR=0))
+			self.rank.append(MemRank())
+
+		# nextRD/nextWR of a MemRank only hold constraints from its own CAS; the ones
+		# from other ranks are applied lazily through these when a rank is checked
+		self.other_RD = OtherRank()
+		self.other_WR = OtherRank()
 
 	# return Rank object
 	def get_rank(self, cmd):
 		return self.rank[cmd.rank]
 
-	# method to update other ranks
-	def set_other_rank(self, rank, param, time):
+	# earliest time the cmd satisfies all its rank constraints
+	def deadline(self, cmd):
+		return RANK_DEADLINE[cmd.cmdType](self, cmd.rank)
+
+	# reset all timing constraints (i.e after refresh); a single rank keeps the tRTR constraints
+	# of the others, they still hold on the shared bus
+	def reset_timing(self, rank=None):
+		for r in (self.rank if rank is None else [self.rank[rank]]):
+			r.nextACT = 0
+			r.nextRD = 0
+			r.nextWR = 0
+			r.numACT = 0
+		if rank is None:
+			self.other_RD.reset()
+			self.other_WR.reset()
 
-		# for all the ranks not equal to the one that just issued the cmd
-		for r in xrange(len(self.rank)):
-			if r != rank:
-					next = self.rank[r].get(param)
-					self.rank[r].set(param, max(next, time))
 
-	# reset all timing constraints (i.e after refresh)
-	def reset_timing(self):
-		for rank in self.rank:
-			rank.set('nextACT', 0)
-			rank.set('nextRD', 0)
-			rank.set('nextWR', 0)
-			rank.set('numACT', 0)
+# Statistics of a controller, cheap enough to always be collected: commands issued per bank, row
+# hit/empty/conflict outcomes, FIFO and command queue occupancy per cycle, refresh stall cycles and
+# the latency of every request per core (arrival at the controller to the data of its last CAS)
+class Stats:
+
+	ROW_NAME = {"OPEN": "hit", "EMPTY": "empty", "CLOSED": "conflict"}
+
+	def __init__(self, numRank, numBank, numQueues):
+		self.num_rank = numRank
+		self.bank_per_rank = numBank
+		self.commands = [[0] * (numRank*numBank) for cmd in CMD_NAME]	#[cmdType][rank*numBank + bank]
+		self.row = {"OPEN": 0, "EMPTY": 0, "CLOSED": 0}				#row_state() outcomes
+		self.fifo = [0] * (numQueues+1)		#cycles with that many commands in the FIFO
+		self.queued = {}					#cycles with that many commands in the cmd queues
+		self.refresh_cycles = 0				#cycles spent draining the FIFO and refreshing (all ranks added up)
+		self.latency = [{} for i in xrange(numQueues)]	#per core: latency in ticks -> requests
+
+	# count cycles with the current occupancy (n cycles at once when idle cycles are skipped)
+	def sample(self, fifo, queued, n=1):
+		self.fifo[fifo] += n
+		self.queued[queued] = self.queued.get(queued, 0) + n
+
+	# all statistics as a dict of plain types (JSON), times in ns
+	def to_dict(self, clock, refCount, tCK):
+		commands = {}
+		for cmdType, name in enumerate(CMD_NAME):
+			count = self.commands[cmdType]
+			bank = [count[r*self.bank_per_rank:(r+1)*self.bank_per_rank] for r in xrange(self.num_rank)]
+			commands[name] = dict(total=sum(count), rank=[sum(b) for b in bank], bank=bank)
+
+		latency = []
+		for hist in self.latency:
+			n = sum(hist.itervalues())
+			core = dict(requests=n, hist=dict((str(to_ns(t)), hist[t]) for t in hist))
+			if n > 0:
+				core.update(mean=to_ns(sum(t*hist[t] for t in hist)) / n, min=to_ns(min(hist)), max=to_ns(max(hist)))
+			latency.append(core)
+
+		return dict(time=to_ns(clock.time),
+				commands=commands,
+				row=dict((self.ROW_NAME[state], self.row[state]) for state in self.row),
+				fifo_occupancy=dict((str(i), n) for i, n in enumerate(self.fifo) if n > 0),
+				cmdq_occupancy=dict((str(i), n) for i, n in self.queued.iteritems()),
+				refresh=dict(count=refCount, stall=to_ns(self.refresh_cycles * tCK)),
+				latency=latency)
 
 
 # Front end
 class FrontEnd:
 
-	def __init__(self, numQueues, numBank, bankState, mem_map, clock, num_intlv):
+	def __init__(self, numQueues, numBank, bankState, mem_map, clock, num_intlv, stats):
 		self.addrMap = MemConfig(mem_map, numBank)
 		self.bankState = bankState
 		self.clock = clock
 		self.intlv = num_intlv
+		self.stats = stats
 		self.reqQ = []
 
 		for i in xrange(numQueues):
@@ -267,8 +366,16 @@ class FrontEnd:
 		if idx > len(self.reqQ):
 			print "FrontEnd: coreID exceed number of requestor queues"
 
+		req.arrival = self.clock.time
 		self.reqQ[idx].append(req)
 
+	# check whether any requestor queue still has requests to convert
+	def has_request(self):
+		for q in self.reqQ:
+			if len(q) > 0:
+				return True
+		return False
+
 	# generate commands of all requestor in parallel and store them in list of list
 	def commandGen(self):
 		# get head of each queue
@@ -277,55 +384,121 @@ class FrontEnd:
 
 		for r in reqList:
 			tmp = []		
-			self.addrMap.get_target(r) #map request
+			if not r.mapped:
+				self.addrMap.get_target(r) #map request
 			state = self.bankState.row_state(r) #get and set bank's row state
+			self.stats.row[state] += 1
 
-			# row closed: Pre-Act-Cas
-			if state == "CLOSED":
-				tmp.append(Command("PRE", r))
-				tmp.append(Command("ACT", r))
-				for i in xrange(self.intlv):	# 32 bit bus need 2 CAS
-					tmp.append(Command("RD", r)) if r.memType == "READ" else tmp.append(Command("WR",r))
-				cmd_list.append(tmp)
-
-			# row open: Cas	
-			elif state == "OPEN":
-				for i in xrange(self.intlv):
-					tmp.append(Command("RD", r)) if r.memType == "READ" else tmp.append(Command("WR",r))
-				cmd_list.append(tmp)
-
-			# row empty: Act-Cas
-			elif state == "EMPTY":
-				tmp.append(Command("ACT", r))
-				for i in xrange(self.intlv):
-					tmp.append(Command("RD", r)) if r.memType == "READ" else tmp.append(Command("WR",r))
-				cmd_list.append(tmp)
-
-			else:
-				print "UNKNOWN STATE...something went wrong"
+			# row closed: Pre-Act-Cas, row open: Cas, row empty: Act-Cas
+			for op in ROW_CMDS[state]:
+				tmp.append(Command(op, r))
+
+			cas = CAS_CMD[r.memType]
+			for i in xrange(self.intlv):	# 32 bit bus need 2 CAS
+				tmp.append(Command(cas, r))
+			tmp[-1].arrival = r.arrival		#the request is done with its last CAS
+			cmd_list.append(tmp)
 
 		return cmd_list
 
 
+# FIFO of commands with at most one command per requestor; a linked list indexed by
+# coreID so membership, append and removal of any command are all O(1)
+class CmdFIFO:
+
+	def __init__(self, numQueues):
+		self.cmd = [None] * numQueues	#cmd of each core inside the FIFO (None if not inside)
+		self.next = [-1] * numQueues
+		self.prev = [-1] * numQueues
+		self.head = -1
+		self.tail = -1
+		self.size = 0
+
+	def __len__(self):
+		return self.size
+
+	# iterate over the commands in FIFO order
+	def __iter__(self):
+		core = self.head
+		while core != -1:
+			nxt = self.next[core]
+			yield self.cmd[core]
+			core = nxt
+
+	# check whether the requestor already has a command inside the FIFO
+	def has_core(self, coreID):
+		return self.cmd[coreID] is not None
+
+	def append(self, cmd):
+		core = cmd.coreID
+		self.cmd[core] = cmd
+		self.prev[core] = self.tail
+		self.next[core] = -1
+		if self.tail == -1:
+			self.head = core
+		else:
+			self.next[self.tail] = core
+		self.tail = core
+		self.size += 1
+
+	def remove(self, cmd):
+		core = cmd.coreID
+		prev = self.prev[core]
+		nxt = self.next[core]
+		if prev == -1:
+			self.head = nxt
+		else:
+			self.next[prev] = nxt
+		if nxt == -1:
+			self.tail = prev
+		else:
+			self.prev[nxt] = prev
+		self.cmd[core] = None
+		self.size -= 1
+
+	def clear(self):
+		for i in xrange(len(self.cmd)):
+			self.cmd[i] = None
+		self.head = -1
+		self.tail = -1
+		self.size = 0
+
+
 # Back End
 class BackEnd:
 
-	def __init__(self, numQueues, bankState, rankState, device, dataQ, clk):
+	def __init__(self, numQueues, bankState, rankState, device, dataQ, clk, stats):
 		self.bankState = bankState
 		self.rankState = rankState
 		self.device = device
 		self.dataQ = dataQ
 		self.clock = clk
+		self.stats = stats
 		self.cmdQ = []
-		self.FIFO = deque()
+		self.queued = 0		#number of commands in all the cmd queues
+		self.blocked_rank = -1	#rank being refreshed on its own, its commands can't enter the FIFO
+		self.FIFO = CmdFIFO(numQueues)
+		# handler to issue each command, indexed by opcode
+		self.__issue_handler = (self.__issue_PRE, self.__issue_ACT, self.__issue_RD, self.__issue_WR)
 		# create deques(queues) for all requestors
 		for i in xrange(numQueues):
 			d = deque()
 			self.cmdQ.append(d)
 
+	# bound methods can't be pickled (checkpoints), the issue handlers are rebuilt on restore
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		del state['_BackEnd__issue_handler']
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self.__issue_handler = (self.__issue_PRE, self.__issue_ACT, self.__issue_RD, self.__issue_WR)
+
 	# add commands from front end to cmd queues 
 	def addCommands(self, cmdList):
 		for core in cmdList:
+			self.queued += len(core)
 			for cmd in core:
 				idx = cmd.coreID
 				self.cmdQ[idx].append(cmd)
@@ -333,19 +506,29 @@ class BackEnd:
 
 	# this method check head of each cmd queue n enqueue to fifo if constraints are met
 	def addToFIFO(self):
+		added = False
+		blocked = self.blocked_rank
 		for queue in self.cmdQ:
 			n = len(queue)
 			if n > 0:
 				head = queue[0]
 				# only add to fifo if the core doesn't have a cmd in the FIFO already and constraints are met
-				if self.not_inside_FIFO(head.coreID) and self.__bank_issuable(head):
+				if self.not_inside_FIFO(head.coreID) and head.rank != blocked and self.__bank_issuable(head):
 					self.FIFO.append(head)
 					queue.popleft()
+					self.queued -= 1
+					added = True
 					#print "Core " + str(head.coreID) + ": enqueue " + str(head.cmdType) + " @ " + str(self.clock.time)
-
-	# empty the FIFO, used for refresh opeartion
-	def emptyFIFO(self):
-		self.FIFO.clear()
+		return added
+
+	# empty the FIFO (or drop the commands of one rank), used for refresh opeartion
+	def emptyFIFO(self, rank=None):
+		if rank is None:
+			self.FIFO.clear()
+			return
+		for cmd in list(self.FIFO):
+			if cmd.rank == rank:
+				self.FIFO.remove(cmd)
 
 	# this method issues the first command in the FIFO that can be issued
 	def issue(self):
@@ -354,31 +537,34 @@ class BackEnd:
 
 		for cmd in self.FIFO:
 			# if a CAS is blocked already, then skip all subsequent CAS
-			if cmd.cmdType == "RD" or cmd.cmdType == "WR":
+			if IS_CAS[cmd.cmdType]:
 				if CAS_blked:
 					continue
 			if self.__rank_issuable(cmd):
 				self.issueCMD(cmd)
 				self.FIFO.remove(cmd)
 				#print "Core " + str(cmd.coreID) + ": issued " + str(cmd.cmdType) + " @ " + str(self.clock.time)
-				break #only issue one cmd in one cycle
-			elif cmd.cmdType == "RD" or cmd.cmdType == "WR":
+				return True #only issue one cmd in one cycle
+			elif IS_CAS[cmd.cmdType]:
 				CAS_blked = True
+		return False
 
-	# fix the head of each command queue for refresh opeartion
-	def ref_command(self):
+	# fix the head of each command queue (of all ranks or of one) for refresh opeartion
+	def ref_command(self, rank=None):
 		for queue in self.cmdQ:
-			if len(queue) > 0:
+			if len(queue) > 0 and (rank is None or queue[0].rank == rank):
 				head = queue[0]
 				# for CAS cmd, add ACT in front of it since row is closed after REF
-				if head.cmdType == "WR" or head.cmdType == "RD":
-					queue.appendleft(Command("ACT",head))
+				if IS_CAS[head.cmdType]:
+					queue.appendleft(Command(CMD_ACT,head))
+					self.queued += 1
 
 				# get rid of PRE, don't need it after REF
-				elif head.cmdType == "PRE":
+				elif head.cmdType == CMD_PRE:
 					queue.popleft()
+					self.queued -= 1
 					#we have P-A-C, A-C or C, there shouldnt be P-C
-					if queue[0].cmdType != "ACT":
+					if queue[0].cmdType != CMD_ACT:
 						print "BackEnd-ref_command(): It should be ACT"
 						exit(1)
 
@@ -388,7 +574,7 @@ class BackEnd:
 			flag = 0
 			for cmd in self.FIFO:
 				# skip PRE and ACT since they don't matter
-				if cmd.cmdType == "PRE" or cmd.cmdType == "ACT":
+				if not IS_CAS[cmd.cmdType]:
 						continue
 
 				# this indicates that there are CAS in the queue still
@@ -402,53 +588,55 @@ class BackEnd:
 
 			return flag
 
+	# check whether a CAS of rank is still in the FIFO (per-rank refresh waits for them)
+	def has_CAS(self, rank):
+		for cmd in self.FIFO:
+			if IS_CAS[cmd.cmdType] and cmd.rank == rank:
+				return True
+		return False
+
+	# earliest time at which addToFIFO() or issue() can make progress
+	def next_event(self):
+		now = self.clock.time
+		wake = float('inf')
+
+		# a FIFO cmd can be issued as soon as its rank constraint is met, except that
+		# CAS behind the first CAS stay blocked until that one is issued
+		CAS_seen = False
+		for cmd in self.FIFO:
+			if IS_CAS[cmd.cmdType]:
+				if CAS_seen:
+					continue
+				CAS_seen = True
+			next = self.rankState.deadline(cmd)
+			if next <= now:
+				return now
+			wake = min(wake, next)
+
+		# head of cmd queue can enter the FIFO once its bank constraint is met
+		for queue in self.cmdQ:
+			if len(queue) > 0 and not self.FIFO.has_core(queue[0].coreID) and queue[0].rank != self.blocked_rank:
+				next = BANK_DEADLINE[queue[0].cmdType](self.bankState.get_bank(queue[0]))
+				if next <= now:
+					return now
+				wake = min(wake, next)
+
+		return wake
+
 	# check wheter a command from the same requestor already exist inside the FIFO
 	def not_inside_FIFO(self, coreID):
-		for cmd in self.FIFO:
-			if cmd.coreID == coreID:
-				return False
-		return True
+		return not self.FIFO.has_core(coreID)
 
 	# check if condition of bank is satisifed
 	def __bank_issuable(self, cmd):
 		# get reference to the bank it's targeting to set bank related constraints
 		bank = self.bankState.get_bank(cmd)
-
-		if cmd.cmdType == "ACT":
-			return self.clock.time >= bank.get('nextACT') 
-
-		elif cmd.cmdType == "PRE":
-			return self.clock.time >= bank.get('nextPRE') 
-
-		elif cmd.cmdType == "RD":
-			return self.clock.time >= bank.get('nextRD') 
-
-		elif cmd.cmdType == "WR":
-			return self.clock.time >= bank.get('nextWR') 
-
-		else:
-			print "BackEnd-BankIssue(): unknown command type"
+		return self.clock.time >= BANK_DEADLINE[cmd.cmdType](bank)
 
 	# check if condition of rank is satisifed
 	def __rank_issuable(self,cmd):
-		# get reference to the rank the cmd is targeting
-		rank = self.rankState.get_rank(cmd)
-
-		if cmd.cmdType == "ACT":
-			return self.clock.time >= rank.get('nextACT') 
-
-		# there are no constraints for PRE b/w banks or ranks
-		elif cmd.cmdType == "PRE":
-			return True
-
-		elif cmd.cmdType == "RD":
-			return self.clock.time >= rank.get('nextRD') 
-
-		elif cmd.cmdType == "WR":
-			return self.clock.time >= rank.get('nextWR') 
-
-		else:
-			print "BackEnd-RankIssue(): unknown command type"
+		# own constraints of the rank the cmd is targeting and tRTR from other ranks
+		return self.clock.time >= self.rankState.deadline(cmd)
 
 
 	# this method issues the command and update all the relevant timing for next cmd
@@ -456,70 +644,75 @@ class BackEnd:
 		# must update the bank state and rank state as well as add data to dataQ
 		bank = self.bankState.get_bank(cmd)
 		rank = self.rankState.get_rank(cmd)
-		clk = self.clock.time
-		mem = self.device
-
-		# ACT
-		if cmd.cmdType == "ACT":
-			bank.set('nextACT', clk + mem.tRC)
-			bank.set('nextRD', clk + mem.tRCD)
-			bank.set('nextWR', clk + mem.tRCD)
-			bank.set('nextPRE', clk + mem.tRAS)
-
-			# tFAW or tRRD
-			numACT = rank.get('numACT')			
-			if numACT + 1 < 4:
-				rank.set('nextACT', clk + mem.tRRD)
-				rank.set('numACT', numACT + 1)
-			elif numACT + 1 == 4:
-				rank.set('nextACT', clk + mem.tFAW - 3*mem.tRRD)
-				rank.set('numACT', 0)
-
-		# PRE
-		elif cmd.cmdType == "PRE":
-			nextACT = bank.get('nextACT')
-			bank.set('nextACT', max(nextACT, clk + mem.tRP))
-
-
-		# READ
-		elif cmd.cmdType == "RD":
-			bank.set('nextRD', clk + mem.tRL + mem.tBUS) #next read of must wait till data is finished
-			bank.set('nextWR', max(mem.tRTW, mem.tRL + mem.tBUS) + clk) #wait till data done or RTW is greater
-			nextPRE = bank.get('nextPRE')
-			bank.set('nextPRE', max(nextPRE, clk + mem.tRTP)) #take the max b/w the prev set nextPRE or tRTP
-
-			#same rank
-			rank.set('nextRD', clk + mem.tBUS)
-			rank.set('nextWR', clk + max(mem.tRTW, mem.tRL + mem.tBUS - mem.tWL))
-
-			#update other ranks for tRTR
-			self.rankState.set_other_rank(cmd.rank, 'nextRD', clk + mem.tBUS + mem.tRTR)
-			self.rankState.set_other_rank(cmd.rank, 'nextWR', clk + mem.tRL + mem.tBUS + mem.tRTR - mem.tWL)
-
-			# add data to dataQ; time is when the data is finished transmission
-			self.dataQ.append(Data(cmd.coreID, clk + mem.tRL + mem.tBUS))
-
-
-		# WRITE
-		elif cmd.cmdType == "WR":
-			bank.set('nextRD', clk + mem.tWL + mem.tBUS + mem.tWTR)
-			bank.set('nextWR', clk + mem.tWL + mem.tBUS)
-			nextPRE = bank.get('nextPRE')
-			bank.set('nextPRE', max(nextPRE, clk + mem.tWL + mem.tBUS + mem.tWR))
-
-			#same rank
-			rank.set('nextRD', clk + mem.tWL + mem.tBUS + mem.tWTR)
-			rank.set('nextWR', clk + mem.tBUS)
-
-			#update other ranks for tRTR
-			self.rankState.set_other_rank(cmd.rank, 'nextRD', clk + mem.tWL + mem.tBUS + mem.tRTR - mem.tRL)
-			self.rankState.set_other_rank(cmd.rank, 'nextWR', clk + mem.tBUS + mem.tRTR)
-
-			# add data to dataQ; time is when the data is finished transmission
-			self.dataQ.append(Data(cmd.coreID, clk + mem.tWL + mem.tBUS))
-
-		else:
-			print "BackEnd-IssueCMD(): unknown command type"
+		self.__issue_handler[cmd.cmdType](cmd, bank, rank, self.clock.time, self.device)
+		self.stats.commands[cmd.cmdType][cmd.rank * self.bankState.bank_per_rank + cmd.bank] += 1
+
+	# a request is done with the data of its last CAS
+	def __request_done(self, cmd, time):
+		latency = self.stats.latency[cmd.coreID]
+		time -= cmd.arrival
+		latency[time] = latency.get(time, 0) + 1
+
+	# ACT
+	def __issue_ACT(self, cmd, bank, rank, clk, mem):
+		bank.nextACT = clk + mem.tRC
+		bank.nextRD = clk + mem.tRCD
+		bank.nextWR = clk + mem.tRCD
+		bank.nextPRE = clk + mem.tRAS
+
+		# tFAW or tRRD
+		numACT = rank.numACT
+		if numACT + 1 < 4:
+			rank.nextACT = clk + mem.tRRD
+			rank.numACT = numACT + 1
+		elif numACT + 1 == 4:
+			rank.nextACT = clk + mem.tFAW - 3*mem.tRRD
+			rank.numACT = 0
+
+	# PRE
+	def __issue_PRE(self, cmd, bank, rank, clk, mem):
+		nextACT = bank.nextACT
+		bank.nextACT = max(nextACT, clk + mem.tRP)
+
+	# READ
+	def __issue_RD(self, cmd, bank, rank, clk, mem):
+		bank.nextRD = clk + mem.tRL + mem.tBUS #next read of must wait till data is finished
+		bank.nextWR = max(mem.tRTW, mem.tRL + mem.tBUS) + clk #wait till data done or RTW is greater
+		nextPRE = bank.nextPRE
+		bank.nextPRE = max(nextPRE, clk + mem.tRTP) #take the max b/w the prev set nextPRE or tRTP
+
+		#same rank
+		rank.nextRD = clk + mem.tBUS
+		rank.nextWR = clk + max(mem.tRTW, mem.tRL + mem.tBUS - mem.tWL)
+
+		#update other ranks for tRTR
+		self.rankState.other_RD.update(cmd.rank, clk + mem.tBUS + mem.tRTR)
+		self.rankState.other_WR.update(cmd.rank, clk + mem.tRL + mem.tBUS + mem.tRTR - mem.tWL)
+
+		# add data to dataQ; time is when the data is finished transmission
+		self.dataQ.append(Data(cmd.coreID, clk + mem.tRL + mem.tBUS))
+		if cmd.arrival is not None:
+			self.__request_done(cmd, clk + mem.tRL + mem.tBUS)
+
+	# WRITE
+	def __issue_WR(self, cmd, bank, rank, clk, mem):
+		bank.nextRD = clk + mem.tWL + mem.tBUS + mem.tWTR
+		bank.nextWR = clk + mem.tWL + mem.tBUS
+		nextPRE = bank.nextPRE
+		bank.nextPRE = max(nextPRE, clk + mem.tWL + mem.tBUS + mem.tWR)
+
+		#same rank
+		rank.nextRD = clk + mem.tWL + mem.tBUS + mem.tWTR
+		rank.nextWR = clk + mem.tBUS
+
+		#update other ranks for tRTR
+		self.rankState.other_RD.update(cmd.rank, clk + mem.tWL + mem.tBUS + mem.tRTR - mem.tRL)
+		self.rankState.other_WR.update(cmd.rank, clk + mem.tBUS + mem.tRTR)
+
+		# add data to dataQ; time is when the data is finished transmission
+		self.dataQ.append(Data(cmd.coreID, clk + mem.tWL + mem.tBUS))
+		if cmd.arrival is not None:
+			self.__request_done(cmd, clk + mem.tWL + mem.tBUS)
 
 
 
@@ -527,21 +720,35 @@ class BackEnd:
 class MemController:
 
 	# mem controller contains all the sub-components
-	def __init__(self, device, RL, WL, numBank, numRank, numCores, memConfig, clock, num_intlv):
+	def __init__(self, device, RL, WL, numBank, numRank, numCores, memConfig, clock, num_intlv, stagger=False):
 		self.clock = clock
 		self.dataQ = deque()
 		self.device = MemDevice(device, RL, WL)
 		self.bank_status = BankState(numRank, numBank)
 		self.rank_status = RankState(numRank)
-		self.front = FrontEnd(numCores, numBank, self.bank_status, memConfig, clock, num_intlv)
-		self.back = BackEnd(numCores, self.bank_status, self.rank_status, self.device, self.dataQ, clock)
-		self.ref_count = 0 #count number of refresh performed
-		self.counter = 0 #an internal counter used for refresh
+		self.stats = Stats(numRank, numBank, numCores)
+		self.front = FrontEnd(numCores, numBank, self.bank_status, memConfig, clock, num_intlv, self.stats)
+		self.back = BackEnd(numCores, self.bank_status, self.rank_status, self.device, self.dataQ, clock, self.stats)
+		self.idle = False #True if the last cycle made no progress
+
+		# refresh: all ranks at once every tREF, or with stagger each rank on its own, spread evenly
+		# over tREF; a refresh waits for the CAS in the FIFO and then takes tRFC (rounded up to cycles)
+		self.num_rank = numRank
+		self.ref_stagger = self.device.tREF // numRank if stagger else None
+		self.ref_cycles = -(-self.device.tRFC // self.device.tCK)
+		self.ref_count = 0 #count number of refresh performed (of single ranks with stagger)
+		self.ref_due = self.__refresh_due(0)	#time the next refresh is due
+		self.ref_start = None	#time the due refresh started draining the FIFO
+		self.ref_end = None		#last cycle of the refresh, once the FIFO is drained
 
 
 	def addRequest(self, req):
 		self.front.addRequest(req)
 
+	# statistics collected so far as plain types (JSON)
+	def get_stats(self):
+		return self.stats.to_dict(self.clock, self.ref_count, self.device.tCK)
+
 	def get_data(self):
 		
 		# The data are added to dataQ in order, so only check if first item can be returned
@@ -552,37 +759,136 @@ class MemController:
 
 		return None
 
+	# all ranks are in a refresh, nothing moves in the controller before ref_end
+	def all_refreshing(self):
+		return self.ref_end is not None and self.ref_stagger is None
+
+	# event-driven mode (and any mode during a refresh of all ranks): skip cycles in which simulate()
+	# and get_data() would do nothing
+	def advance(self, until):
+		# nothing to skip if a core is due or there are requests to convert (unless all ranks are
+		# refreshing: then nothing moves before the refresh ends)
+		if until <= self.clock.time:
+			return
+		if self.all_refreshing():
+			wake = until
+		elif self.front.has_request():
+			return
+		else:
+			wake = min(until, self.back.next_event())
+		tCK = self.device.tCK
 
-	def simulate(self):
-
-		# Step A: Perform Refresh if necessary
-		if int(self.clock.time/self.device.tREF) > self.ref_count:
-
-			# Step 1: issues all reamining CAS in FIFO
-			if self.back.ref_issue() == 0:
-				#empty the FIFO
-				self.back.emptyFIFO()
-
-				# now refresh operation can start
-				self.counter += 1
+		# last cycle before the head of dataQ is returned or the next refresh starts or ends
+		if len(self.dataQ) > 0:
+			wake = min(wake, self.dataQ[0].time - tCK)
+		wake = min(wake, self.ref_due if self.ref_end is None else self.ref_end)
+
+		# jump to the first cycle boundary at or after wake so the cycle count stays identical
+		if wake > self.clock.time:
+			skipped = -((self.clock.time - wake) // tCK)
+			self.stats.sample(self.back.FIFO.size, self.back.queued, skipped)
+			self.clock.time += skipped * tCK
+
+	# sampled simulation: jump the clock to time (a cycle boundary) without simulating the cycles
+	# in between; the data in flight is returned at once and the refreshes in between are skipped
+	def skip_to(self, time):
+		data = list(self.dataQ)
+		self.dataQ.clear()
+
+		# complete a refresh that is in progress, drop one that is still draining the FIFO
+		if self.ref_end is not None:
+			self.__refresh_done()
+		elif self.ref_start is not None and self.ref_stagger is not None:
+			self.back.blocked_rank = -1
+			self.rank_status.rank[self.ref_count % self.num_rank].nextACT = 0
+		self.ref_start = None
+
+		self.clock.time = time
+		if self.ref_stagger is None:
+			self.ref_count = time // self.device.tREF
+		else:
+			self.ref_count = sum(max(0, (time - r*self.ref_stagger) // self.device.tREF) for r in xrange(self.num_rank))
+		self.ref_due = self.__refresh_due(self.ref_count)
+		self.idle = False
+		return data
+
+
+	# data get_data() will hand out until the clock reaches until, provided nothing issued from now on
+	# returns that early (used by the multi-channel system to run the cores ahead of the channels)
+	def peek_data(self, until):
+		tCK = self.device.tCK
+		time = self.clock.time
+		data = []
+		i = 0
+		while time < until:
+			time += tCK
+			if i < len(self.dataQ) and self.dataQ[i].time == time:
+				data.append(self.dataQ[i])
+				i += 1
+		return data
+
+
+	# time refresh number k is due: every tREF for all ranks at once, or rank k % numRank at its
+	# place in the stagger
+	def __refresh_due(self, k):
+		if self.ref_stagger is None:
+			return (k+1) * self.device.tREF
+		return (k // self.num_rank + 1) * self.device.tREF + (k % self.num_rank) * self.ref_stagger
+
+	# one cycle of the due refresh: the CAS in the FIFO are issued first, then the refresh runs up to
+	# ref_end as a single timed event and the queues and timing are fixed up when it is over.
+	# Returns True if the controller does nothing else in this cycle (all ranks refreshing)
+	def refresh(self):
+		now = self.clock.time
+		lockstep = self.ref_stagger is None
+		rank = None if lockstep else self.ref_count % self.num_rank
+
+		# Step 1: issues all reamining CAS in FIFO (of the rank, the others go on with stagger)
+		if self.ref_end is None:
+			if self.ref_start is None:
+				self.ref_start = now
+				if not lockstep:
+					self.back.blocked_rank = rank
+					self.rank_status.rank[rank].nextACT = NEVER	#no ACT until the refresh is over
+			if lockstep:
+				self.idle = False
+				if self.back.ref_issue() != 0:
+					return True
+			elif self.back.has_CAS(rank):
+				return False
 
-			# Step 2: refresh operation finished
-			if self.counter == self.device.tRFC:				
-				# update the head of each cmdQ (i.e. head should all be ACT)
-				self.back.ref_command()
+			# now refresh operation can start, the commands left in the FIFO are squashed
+			self.back.emptyFIFO(rank)
+			self.ref_end = now + (self.ref_cycles - 1) * self.device.tCK
+
+		# Step 2: refresh operation finished at the end of its last cycle
+		if now >= self.ref_end:
+			self.__refresh_done()
+		self.idle = lockstep
+		return lockstep
+
+	# end of a refresh: the head of each cmdQ is fixed (i.e. head should all be ACT) and the timing
+	# parameters are reset to zero (i.e. any cmd can be issued after REF)
+	def __refresh_done(self):
+		rank = None if self.ref_stagger is None else self.ref_count % self.num_rank
+		self.back.ref_command(rank)
+		self.bank_status.reset_timing(rank)
+		self.rank_status.reset_timing(rank)
+		self.back.blocked_rank = -1
+
+		self.stats.refresh_cycles += (self.ref_end - self.ref_start) // self.device.tCK + 1
+		self.ref_count += 1
+		self.ref_due = self.__refresh_due(self.ref_count)
+		self.ref_start = None
+		self.ref_end = None
 
-				# reset timing parameters to zero (i.e. any cmd can be issued after REF)
-				self.bank_status.reset_timing()
-				self.rank_status.reset_timing()
-				
-				# update refresh count and reset counter
-				self.ref_count += 1
-				self.counter = 0
-				#print self.ref_count
+	def simulate(self):
 
+		# Step A: Perform Refresh if necessary (refresh() tells whether all ranks are busy with it)
+		refreshing = self.clock.time >= self.ref_due and self.refresh()
 
 		# Step B: otherwise perform normal operation
-		else:
+		if not refreshing:
 			#Step 1: generate commands for all request at head of each requestor queue
 			cmd = self.front.commandGen()
 
@@ -590,13 +896,19 @@ class MemController:
 			self.back.addCommands(cmd)
 
 			#Step 3: back end enqueues head commands into FIFO
-			self.back.addToFIFO()
+			added = self.back.addToFIFO()
 
 			#Step 4: back end issues the first command that can be issued
-			self.back.issue()
+			issued = self.back.issue()
+
+			self.idle = not (cmd or added or issued)
 
 
-		# Step C: Advace clock to next cycle in nano-second
+		# Step C: Advace clock to next cycle in pico-second
+		stats = self.stats
+		stats.fifo[self.back.FIFO.size] += 1
+		queued = self.back.queued
+		stats.queued[queued] = stats.queued.get(queued, 0) + 1	#same as stats.sample(), inlined for every cycle
 		self.clock.time += self.device.tCK
 
 
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+""" Multi-channel memory system: every channel is its own MemController (with its own ranks, banks
+	and refresh) and a request goes to the channel selected by the channel bits of its address
+	(MemConfig.get_channel). Each core keeps its private bank in every channel.
+
+	The channels only interact through the cores, so they are stepped independently between
+	synchronization points. The quantum is one cycle shorter than the smallest CAS to data latency
+	(tRL/tWL + tBUS): the data a channel hands out up to a quantum after the cycle it was simulated to
+	was issued before that cycle, so once the channels are caught up the data of the next quantum
+	(the horizon) is known. The cores run up to the horizon on it, and past it for as long as none of
+	them can send on data that comes later: a core waiting for data sends at the earliest the delay
+	of its next request after the data (Core.data_delay in sim-RTSS). Only then are the channels
+	caught up (sync), with several quanta per step when the cores don't wait on each other, and the
+	data they handed out past the horizon is given to the cores afterwards. The result is exactly the
+	same as stepping everything together cycle by cycle.
+
+	The channels run in-process or each in its own worker process, one round trip per sync. """
+
+import multiprocessing
+from MemCntlr import *
+
+__metaclass__ = type
+
+MAX_QUANTA = 64		#most quanta the cores run ahead of the channels between two syncs
+
+
+# One channel: a memory controller with its own clock, fed with the requests sent since the last
+# sync; device is the open timing file, only its name is used (MemDevice)
+class Channel:
+
+	def __init__(self, device, RL, WL, numBank, numRank, numCores, memConfig, num_intlv, stagger):
+		self.clock = Clock()
+		self.MC = MemController(device, RL, WL, numBank, numRank, numCores, memConfig, self.clock, num_intlv, stagger)
+		self.known = 0		#the data up to here was returned by an earlier step
+
+	# simulate the cycles up to until; requests are (cycle, Request) in cycle order. Returns the data
+	# handed out up to until that an earlier step did not return yet and the data that will be
+	# handed out in the cycles up to next_until
+	def step(self, requests, until, next_until):
+		MC = self.MC
+		late = []
+		i = 0
+		n = len(requests)
+		while self.clock.time < until:
+			while i < n and requests[i][0] == self.clock.time:
+				MC.addRequest(requests[i][1])
+				i += 1
+			MC.simulate()
+			data = MC.get_data()
+			if data is not None and data.time > self.known:
+				late.append(data)
+
+			# skip the idle cycles up to the next request, as in event-driven mode
+			if MC.idle:
+				MC.advance(requests[i][0] if i < n else until)
+		self.known = next_until
+		return late, MC.peek_data(next_until)
+
+
+# worker process of a channel: steps it on every message until it gets None
+def serve(conn, args):
+	channel = Channel(*args)
+	while True:
+		msg = conn.recv()
+		if msg is None:
+			break
+		conn.send(channel.step(*msg))
+	conn.close()
+
+
+# The memory system seen by the cores: collects their requests per channel and hands out the
+# data of all channels; sync() steps the channels up to the time the cores ran to
+class MultiChannel:
+
+	def __init__(self, device, RL, WL, numBank, numRank, numCores, memConfig, clock, num_intlv,
+			numChannel, channelShift, workers=False, stagger=False):
+		self.clock = clock
+		self.addrMap = MemConfig(memConfig, numBank, numChannel, channelShift)
+		self.num_channel = numChannel
+
+		mem = MemDevice(device, RL, WL)
+		self.tCK = mem.tCK
+		self.quantum = max(1, (min(mem.tRL, mem.tWL) + mem.tBUS) // mem.tCK - 1) * mem.tCK
+
+		self.requests = [[] for i in xrange(numChannel)]	#(cycle, Request) sent since the last sync
+		self.data = [[] for i in xrange(numChannel)]		#data handed out up to the horizon
+		self.until = 0		#the channels are simulated up to here
+		self.horizon = self.quantum		#the data is known up to here
+
+		args = (device, RL, WL, numBank, numRank, numCores, memConfig, num_intlv, stagger)
+		self.conns = None
+		self.channels = None
+		if workers:
+			self.conns = []
+			self.procs = []
+			for i in xrange(numChannel):
+				conn, child = multiprocessing.Pipe()
+				proc = multiprocessing.Process(target=serve, args=(child, args))
+				proc.daemon = True
+				proc.start()
+				self.conns.append(conn)
+				self.procs.append(proc)
+		else:
+			self.channels = [Channel(*args) for i in xrange(numChannel)]
+
+	def addRequest(self, req):
+		self.requests[self.addrMap.get_channel(req.addr)].append((self.clock.time, req))
+
+	# data of all channels that is handed out at the current time (at most one per channel)
+	def get_data(self):
+		out = []
+		for data in self.data:
+			if data and data[0].time == self.clock.time:
+				out.append(data.pop(0))
+		return out
+
+	# the cores may run up to here before the channels have to be caught up
+	def sync_limit(self):
+		return self.until + MAX_QUANTA * self.quantum
+
+	# step all channels up to the current time and get the data of the next quantum; returns the
+	# data handed out past the old horizon, by time and then channel as get_data would
+	def sync(self):
+		until = self.clock.time
+		msg = (until, until + self.quantum)
+		if self.conns is not None:
+			for conn, requests in zip(self.conns, self.requests):
+				conn.send((requests,) + msg)
+			steps = [conn.recv() for conn in self.conns]
+		else:
+			steps = [channel.step(requests, *msg) for channel, requests in zip(self.channels, self.requests)]
+		self.data = [data for late, data in steps]
+		self.requests = [[] for i in xrange(self.num_channel)]
+		self.until = until
+		self.horizon = until + self.quantum
+
+		late = []
+		for ch, (data, peek) in enumerate(steps):
+			late.extend((d.time, ch, d) for d in data)
+		late.sort()
+		return [d for t, ch, d in late]
+
+	# stop the worker processes
+	def close(self):
+		if self.conns is not None:
+			for conn in self.conns:
+				conn.send(None)
+			for proc in self.procs:
+				proc.join()
+			self.conns = None
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+""" Phase profiler for the simulators: wraps the methods of each phase with a wall clock timer and a
+	call counter. Only the classes of a profiled run are wrapped, so a normal run pays nothing.
+	Phases can be nested (e.g. FrontEnd.commandGen inside MemController.simulate); the time a parent
+	spends outside its children is reported on its own line. """
+
+import time
+
+__metaclass__ = type
+
+
+class PhaseProfiler:
+
+	def __init__(self):
+		self.phases = []		#(name, parent) in report order
+		self.calls = {}			#phase name -> number of calls
+		self.time = {}			#phase name -> seconds
+
+	# time every call of cls.method as phase name; methods sharing a phase name add up
+	def wrap(self, cls, method, name=None, parent=None):
+		name = name or cls.__name__ + '.' + method
+		if name not in self.calls:
+			self.phases.append((name, parent))
+			self.calls[name] = 0
+			self.time[name] = 0.0
+
+		func = getattr(cls, method).im_func
+		calls = self.calls
+		spent = self.time
+		timer = time.time
+
+		def timed(*args):
+			start = timer()
+			result = func(*args)
+			spent[name] += timer() - start
+			calls[name] += 1
+			return result
+
+		setattr(cls, method, timed)
+
+	# per phase breakdown of a run that took wall seconds and simulated simulated ns
+	def report(self, wall, simulated):
+		lines = ["%-36s %10s %10s %7s %9s" % ("phase", "calls", "time (s)", "% wall", "us/call")]
+
+		def line(label, calls, seconds):
+			per_call = seconds / calls * 1e6 if calls else 0.0
+			lines.append("%-36s %10d %10.3f %7.1f %9.2f" % (label, calls, seconds, 100 * seconds / wall, per_call))
+
+		top = 0.0
+		for name, parent in self.phases:
+			if parent is not None:
+				continue
+			line(name, self.calls[name], self.time[name])
+			top += self.time[name]
+
+			# children, and what is left of the parent
+			children = [child for child, p in self.phases if p == name]
+			for child in children:
+				line("  " + child, self.calls[child], self.time[child])
+			if children:
+				line("  (rest of " + name + ")", 0, self.time[name] - sum(self.time[c] for c in children))
+
+		line("(rest of the loop)", 0, wall - top)
+		lines.append("wall %.3f s, simulated %.1f ns, %.0f simulated ns per wall second" % (wall, simulated, simulated / wall))
+		return "\n".join(lines)
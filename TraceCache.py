@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+""" Binary trace cache: converts a text trace ("addr type delta" per line) once into a compact
+	column format stored next to it, then memory-maps the cache so the tools can walk the
+	trace without any regex or int() work.
+
+	Cache layout (little-endian):
+		header: magic, version, count, source mtime, source size
+		addr column: count x uint64
+		delta column: count x int64
+		type column: count x uint8 (REQ_READ / REQ_WRITE)
+
+	The cache is rebuilt whenever the mtime or size of the text trace changes. A trace is loaded
+	once per process: every load of the same file returns the same read-only TraceData, and the
+	tools keep their own position in it, so interference cores running one trace share it.
+
+	Usage: ./TraceCache.py trc1 [trc2 ...]   (pre-build the caches) """
+
+import os
+import re
+import sys
+import mmap
+import struct
+from MemCntlr import req_type, REQ_NAME, numpy
+
+__metaclass__ = type
+
+CACHE_EXT = '.cache'
+MAGIC = 'MTRC'
+VERSION = 1
+HEADER = struct.Struct('<4sIQdQ')
+ADDR = struct.Struct('<Q')
+DELTA = struct.Struct('<q')
+TYPE = struct.Struct('<B')
+
+_traces = {}		#real path of the text trace -> TraceData
+
+
+# A parsed trace backed by the (memory-mapped) cache; requests are read by index.
+# It is never modified, so one instance is shared by all the readers of a trace.
+class TraceData:
+
+	def __init__(self, buf, name):
+		self.buf = buf
+		self.name = name
+		magic, version, self.count, mtime, size = HEADER.unpack_from(buf, 0)
+		self.addr_off = HEADER.size
+		self.delta_off = self.addr_off + self.count * ADDR.size
+		self.type_off = self.delta_off + self.count * DELTA.size
+
+	def __len__(self):
+		return self.count
+
+	# a pickled trace (checkpoints) only keeps its path and is loaded again on unpickling
+	def __reduce__(self):
+		return (load, (self.name,))
+
+	def addr(self, i):
+		return ADDR.unpack_from(self.buf, self.addr_off + i * ADDR.size)[0]
+
+	def delta(self, i):
+		return DELTA.unpack_from(self.buf, self.delta_off + i * DELTA.size)[0]
+
+	def mem_type(self, i):
+		return TYPE.unpack_from(self.buf, self.type_off + i)[0]
+
+	# address column as a numpy array (a view of the cache, not a copy)
+	def addr_array(self):
+		return numpy.frombuffer(self.buf, dtype='<u8', count=self.count, offset=self.addr_off)
+
+	# delta column as a numpy array (a view of the cache)
+	def delta_array(self):
+		return numpy.frombuffer(self.buf, dtype='<i8', count=self.count, offset=self.delta_off)
+
+	# type column (REQ_READ / REQ_WRITE) as a numpy array (a view of the cache)
+	def type_array(self):
+		return numpy.frombuffer(self.buf, dtype='<u1', count=self.count, offset=self.type_off)
+
+	# memory type as the string found in the text trace
+	def type_name(self, i):
+		return REQ_NAME[self.mem_type(i)]
+
+	# return [addr, type, delta] of the i-th request
+	def line(self, i):
+		return [self.addr(i), self.mem_type(i), self.delta(i)]
+
+
+# parse the text trace and return the cache contents as a string
+def convert(path):
+	addr = []
+	delta = []
+	memType = []
+	in_file = open(path, 'r')
+
+	# same parsing as the tools: stop at EOF or at the first empty line
+	for input_line in in_file:
+		if input_line == '\n':
+			break
+		field = re.split('\W+', input_line)
+		addr.append(int(field[0], base=16))
+		memType.append(req_type(field[1]))
+		delta.append(int(field[2]))
+	in_file.close()
+
+	count = len(addr)
+	stat = os.stat(path)
+	return (HEADER.pack(MAGIC, VERSION, count, stat.st_mtime, stat.st_size)
+			+ struct.pack('<%dQ' % count, *addr)
+			+ struct.pack('<%dq' % count, *delta)
+			+ struct.pack('<%dB' % count, *memType))
+
+
+# check whether the cache exists and was built from the current version of the text trace
+def is_valid(path, cache_path):
+	if not os.path.exists(cache_path):
+		return False
+
+	stat = os.stat(path)
+	cache_file = open(cache_path, 'rb')
+	head = cache_file.read(HEADER.size)
+	cache_file.close()
+	if len(head) != HEADER.size:
+		return False
+
+	magic, version, count, mtime, size = HEADER.unpack(head)
+	return magic == MAGIC and version == VERSION and mtime == stat.st_mtime and size == stat.st_size
+
+
+# return the trace at path, building its cache first if it is missing or stale;
+# the same file is only loaded once, later calls return the shared TraceData
+def load(path):
+	key = os.path.realpath(path)
+	if key not in _traces:
+		_traces[key] = _load(path)
+	return _traces[key]
+
+
+# load the trace at path from its cache
+def _load(path):
+	cache_path = path + CACHE_EXT
+
+	if not is_valid(path, cache_path):
+		data = convert(path)
+		try:
+			tmp_path = cache_path + '.%d' % os.getpid()
+			out_file = open(tmp_path, 'wb')
+			out_file.write(data)
+			out_file.close()
+			os.rename(tmp_path, cache_path)	#atomic so parallel runs never see a partial cache
+		except (IOError, OSError):
+			# can't write next to the trace, just use the parsed data directly
+			return TraceData(data, path)
+
+	cache_file = open(cache_path, 'rb')
+	buf = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+	cache_file.close()
+	return TraceData(buf, path)
+
+
+def main():
+	for path in sys.argv[1:]:
+		trace = load(path)
+		print path + CACHE_EXT + ": " + str(len(trace)) + " requests"
+
+
+if __name__ == '__main__': main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+""" Synthetic trace generator: seedable request streams that are generated lazily, so interference
+	cores can run on endless streams without any trace file.
+
+	Patterns (the address of the next request):
+		seq		consecutive 64 byte lines
+		stride	base + i * stride bytes
+		random	uniformly random line
+	The seq and stride patterns set their own row hits (how many requests share a row depends on
+	the stride and on the memory configuration), so row=r only applies to random: the next request
+	stays in the row of the one before with probability r and goes to another row otherwise, which
+	makes r the row hit ratio of the stream for the private bank of a core in either memory configuration.
+	write=w makes a request a write with probability w; row and write are the -r and -w knobs of
+	wcet-syn.py. delta=a or delta=a-b is the number of cycles before the request (uniform in [a, b]).
+
+	A stream can stand in for a trace in sim-RTSS.py: a line of the trace list of the form
+		gen:<pattern>[,row=r][,write=w][,delta=a-b][,stride=s][,seed=n][,n=count]
+	gives that core its own stream. Without n the stream never ends; with n it replays the same
+	count requests on every pass, like a trace file that wraps.
+
+	Usage: ./TraceGen.py random -n 1000 -r 0.5 -w 0.3 -d 10-60 -o trc   (write a text trace) """
+
+import sys
+import random
+import argparse
+from MemCntlr import REQ_READ, REQ_WRITE, REQ_NAME
+
+__metaclass__ = type
+
+SPEC_PREFIX = 'gen:'
+PATTERNS = ('seq', 'stride', 'random')
+LINE = 64				#bytes per request
+COLUMN_BITS = 13		#address bits below the row and bank bits in both memory configurations
+ROW_BITS = 0x07ff0000	#address bits that are row bits in both memory configurations
+ADDR_MASK = (1 << 32) - 1
+
+
+# A lazily generated request stream with the interface of TraceCache.TraceData that a Core uses:
+# len() and line(i), where i goes 0, 1, 2, ... and back to 0 when the core wraps around
+class Stream:
+
+	def __init__(self, pattern='random', count=0, row_hit=0.0, write=0.0, delta=(0, 0), stride=8192, seed=1, base=0):
+		if pattern not in PATTERNS:
+			raise ValueError("Unknown pattern " + pattern)
+		if row_hit and pattern != 'random':
+			raise ValueError("A row hit ratio only applies to the random pattern, " + pattern + " sets its own row hits")
+		self.name = SPEC_PREFIX + pattern
+		self.pattern = pattern
+		self.count = count			#requests per pass, 0 for an endless stream
+		self.row_hit = row_hit
+		self.write = write
+		self.delta = delta
+		self.stride = stride
+		self.seed = seed
+		self.base = base
+		self.reset()
+
+	# start over; a stream always replays the same requests after a reset
+	def reset(self):
+		self.rng = random.Random(self.seed)
+		self.index = 0				#index of the next request
+		self.addr = self.base		#address of the last request
+
+	def __len__(self):
+		return self.count or sys.maxint
+
+	# address of the index-th request of the pattern
+	def __pattern_addr(self, index):
+		if self.pattern == 'seq':
+			return (self.base + index * LINE) & ADDR_MASK
+		elif self.pattern == 'stride':
+			return (self.base + index * self.stride) & ADDR_MASK
+		return self.rng.getrandbits(32) & ~(LINE-1)
+
+	# generate the next request as [addr, type, delta]
+	def next_request(self):
+		rng = self.rng
+		if self.index > 0 and rng.random() < self.row_hit:
+			# same row (and bank), another line in it
+			self.addr = (self.addr & ~((1 << COLUMN_BITS) - 1)) | (rng.getrandbits(COLUMN_BITS) & ~(LINE-1))
+		else:
+			addr = self.__pattern_addr(self.index)
+
+			# a random line that falls in the same row is moved to another one, so row is the hit ratio
+			if self.pattern == 'random' and self.index > 0 and (addr ^ self.addr) & ROW_BITS == 0:
+				addr ^= ROW_BITS & -ROW_BITS	#flip the lowest of them
+			self.addr = addr
+		memType = REQ_WRITE if rng.random() < self.write else REQ_READ
+		delta = rng.randint(*self.delta)
+		self.index += 1
+		return [self.addr, memType, delta]
+
+	# i-th request; streams are generated in order, so only the next one or a restart can be asked for
+	def line(self, i):
+		if i != self.index:
+			if i != 0:
+				raise ValueError("Stream " + self.name + " can only be read in order")
+			self.reset()
+		return self.next_request()
+
+	# requests of one pass (endless without a count)
+	def __iter__(self):
+		self.reset()
+		while self.count == 0 or self.index < self.count:
+			yield self.next_request()
+
+	# write one pass as an "addr type delta" text trace
+	def write_text(self, out_file):
+		for addr, memType, delta in self:
+			out_file.write("%08x %s %d\n" % (addr, REQ_NAME[memType], delta))
+
+
+# check whether a trace list entry is a generator spec instead of a file name
+def is_spec(name):
+	return name.startswith(SPEC_PREFIX)
+
+
+# build the Stream described by a spec such as gen:random,row=0.5,write=0.3,delta=10-60,seed=2
+def parse(spec):
+	fields = spec[len(SPEC_PREFIX):].split(',')
+	kwargs = {}
+	for field in fields[1:]:
+		key, value = field.split('=')
+		if key == 'row':
+			kwargs['row_hit'] = float(value)
+		elif key == 'write':
+			kwargs['write'] = float(value)
+		elif key == 'delta':
+			kwargs['delta'] = parse_range(value)
+		elif key in ('stride', 'seed', 'base'):
+			kwargs[key] = int(value, 0)
+		elif key == 'n':
+			kwargs['count'] = int(value)
+		else:
+			raise ValueError("Unknown generator option " + key + " in " + spec)
+	return Stream(fields[0], **kwargs)
+
+
+# "a" or "a-b" as the (a, b) range of a delta
+def parse_range(value):
+	low, sep, high = value.partition('-')
+	return (int(low), int(high)) if sep else (int(low), int(low))
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Write a synthetic trace',
+	                                epilog="Example Usage: ./TraceGen.py random -n 1000 -r 0.5 -w 0.3 -o trc",
+	                                usage='%(prog)s [options]')
+	parser.add_argument('pattern', choices=PATTERNS, help="Address pattern")
+	parser.add_argument('-n', '--count', type=int, default=1000, help="Number of requests")
+	parser.add_argument('-r', '--row', type=float, default=0.0, help="Row hit ratio (random pattern only)")
+	parser.add_argument('-w', '--write', type=float, default=0.0, help="Write ratio")
+	parser.add_argument('-d', '--delta', default='0', help="Cycles before each request, a or a-b")
+	parser.add_argument('--stride', type=int, default=8192, help="Bytes between requests of the stride pattern")
+	parser.add_argument('--seed', type=int, default=1, help="Random seed")
+	parser.add_argument('-o', '--output', default=None, help="Output file (default stdout)")
+	args = parser.parse_args()
+
+	if args.count < 1:
+		parser.error("a trace needs at least one request")
+	if args.row and args.pattern != 'random':
+		parser.error("--row only applies to the random pattern")
+
+	stream = Stream(args.pattern, args.count, args.row, args.write, parse_range(args.delta), args.stride, args.seed)
+	out_file = open(args.output, 'w') if args.output else sys.stdout
+	stream.write_text(out_file)
+	if args.output:
+		out_file.close()
+
+
+if __name__ == '__main__': main()
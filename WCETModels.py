@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+""" Analytic WCET models (AMC, RTSS-2013, RTAS-2013 and the multi-rank THESIS model). This is the
+	only copy of the formulas: wcet-syn.py and wcet-bmark.py evaluate them for a single device (plain
+	Python numbers, numpy is not needed), and the grid functions evaluate them with numpy broadcasting
+	over a whole design space at once, with every term an array over the grid axes:
+
+		device: (device name, RL, WL) from the device registry
+		cores:  total number of cores
+		ranks:  number of ranks
+		row:    row hit ratio (only for the synthetic WCET of a single request)
+
+	Results are returned as labeled arrays. Run as a script it replaces the wcet-syn.py sweep with
+	a single call and writes the same JSON lines as ./sweep.py syn.
+
+	Example Usage: ./WCETModels.py --all -o results/syn.json """
+
+import os
+import json
+import math
+import argparse
+import DeviceRegistry
+
+try:
+	import numpy
+except ImportError:
+	numpy = None	#only needed for the grids; a single point is evaluated with plain Python numbers
+
+__metaclass__ = type
+
+MODELS = ('AMC', 'RTSS', 'RTAS', 'THESIS')
+
+
+# An array whose axes are labeled, e.g. values[d, c, r] is the point (devices[d], cores[c], ranks[r])
+class LabeledArray:
+
+	def __init__(self, values, axes):
+		self.axes = axes	#list of (axis name, labels)
+		self.values = numpy.broadcast_to(values, tuple(len(labels) for name, labels in axes))
+
+	@property
+	def dims(self):
+		return tuple(name for name, labels in self.axes)
+
+	# value at the given labels, e.g. sel(device=("DDR3-1333H", 9, 7), cores=4, ranks=2)
+	def sel(self, **labels):
+		idx = tuple(labels_.index(labels[name]) for name, labels_ in self.axes)
+		return self.values[idx]
+
+	# iterate over all points as (dict of labels, value)
+	def items(self):
+		for idx in numpy.ndindex(self.values.shape):
+			point = dict((name, labels[i]) for (name, labels), i in zip(self.axes, idx))
+			yield point, self.values[idx]
+
+
+# Constraints of a list of (device, RL, WL) as arrays along the first grid axis
+class DeviceGrid:
+
+	def __init__(self, devices, ndim=3):
+		self.devices = list(devices)
+		device = [DeviceRegistry.get_device(name, RL, WL) for name, RL, WL in self.devices]
+		shape = (len(device),) + (1,) * (ndim-1)
+
+		for name in DeviceRegistry.Device._fields[1:]:
+			setattr(self, name, numpy.array([getattr(d, name) for d in device]).reshape(shape))
+
+
+# element-wise max, floor, ceil and select: numpy on grid arrays, math and builtins on a single point
+def _grid(*values):
+	return numpy is not None and any(isinstance(v, numpy.ndarray) for v in values)
+
+def maximum(a, b):
+	return numpy.maximum(a, b) if _grid(a, b) else max(a, b)
+
+def floor(x):
+	return numpy.floor(x) if _grid(x) else math.floor(x)
+
+def ceil(x):
+	return numpy.ceil(x) if _grid(x) else math.ceil(x)
+
+def where(cond, a, b):
+	if _grid(cond, a, b):
+		return numpy.where(cond, a, b)
+	return a if cond else b
+
+
+# tDP, tDA and tIA parts shared by the RTSS based models; tIP and the tIA parts are model specific
+def tAC_parts(mem, tIP, tIA):
+	# tDP
+	tDP_c_rd = maximum(maximum((mem.tRTP-(mem.tRL+mem.tBUS)), (mem.tRAS - (mem.tRL+mem.tBUS+mem.tRCD))), 0)
+	tDP_o_rd = maximum((mem.tRTP-(mem.tRL+mem.tBUS)), 0)
+	tDP_wr = maximum((mem.tWR), (mem.tRAS - (mem.tWL+mem.tBUS+mem.tRCD)))
+
+	# tDA
+	tDA_c_rd = maximum((tDP_c_rd + tIP + mem.tRP), (mem.tRC - (mem.tRL+mem.tBUS+mem.tRCD)))
+	tDA_o_rd = (tDP_o_rd + tIP + mem.tRP)
+	tDA_wr = (tDP_wr + tIP + mem.tRP)
+
+	# tAC
+	return dict(tAC_wr=tDA_wr + tIA + mem.tRCD,
+			tAC_c_rd=tDA_c_rd + tIA + mem.tRCD,
+			tAC_o_rd=tDA_o_rd + tIA + mem.tRCD)
+
+
+# AMC: latency of a read/write, intlv banks interleaved
+def amc_terms(mem, cores, intlv):
+	L_R = mem.tRCD + mem.tRL + intlv*mem.tBUS
+	L_W = mem.tRCD + mem.tWL + intlv*mem.tBUS
+	return dict(t_R=L_R + (cores-1)*mem.tRC, t_W=L_W + (cores-1)*mem.tRC)
+
+
+# RTSS-2013 (Zheng's Paper)
+def rtss_terms(mem, cores):
+	tIP = (cores-1)*mem.tCK
+	tIA = (mem.tFAW - 4*mem.tRRD) + floor((cores-1)/4.0)*mem.tFAW + ((cores-1)%4)*mem.tRRD
+	terms = tAC_parts(mem, tIP, tIA)
+
+	# cores/2 is an integer division in the scalar model, so floor and ceil are the same
+	terms['tCD_wr'] = (cores//2)*(mem.tWTR + mem.tRTW) + (cores//2)*(mem.tWL + mem.tBUS)
+	terms['tCD_rd'] = (mem.tWTR+mem.tRL+mem.tBUS) + floor((cores-1)/2.0)*(mem.tWTR+mem.tRTW) + ceil((cores-1)/2.0)*(mem.tWL+mem.tBUS)
+	return terms
+
+
+# THESIS (multi-rank version of RTSS); M_r = cores/rank cores per rank
+def thesis_terms(mem, cores, rank):
+	total_core = cores
+	cores = total_core // rank
+
+	tIP = (total_core-1)*mem.tCK
+	tIA = (mem.tFAW - 4*mem.tRRD) + floor((cores-1)/4.0)*mem.tFAW + ((cores-1)%4)*mem.tRRD + (total_core-cores)*mem.tCK
+	terms = tAC_parts(mem, tIP, tIA)
+
+	F_R = mem.tWTR + mem.tRL + mem.tBUS
+	F_W = mem.tWL + mem.tBUS
+
+	D_WR = F_R
+	D_RW = mem.tRTW + mem.tWL - mem.tRL
+	D_RNK = mem.tRTR + mem.tBUS
+
+	N_WR_rd = floor(cores/2.0)	# W-R of other ranks and of my rank for a read
+	N_WR_wr = floor((cores-1)/2.0)	# W-R of my rank for a write
+
+	# odd M_r: other ranks start with a read; even M_r: only my rank can, and only for a write
+	odd = (cores % 2 == 1)
+	first_rd = where(odd, F_R, F_W)
+	first_wr = F_R
+
+	# upper bound on x, lower bound on z (one more when my rank gives the extra read)
+	x_rd = rank * N_WR_rd
+	x_wr = (rank-1) * N_WR_rd + N_WR_wr
+	z_rd = rank - 1
+	z_wr = where(odd, rank - 1, rank)
+
+	# bound on z can increase more if it's greater than D_RW
+	more_z = (D_RNK >= D_RW)
+	z_rd = where(more_z, (total_core - 1) - x_rd, z_rd)
+	z_wr = where(more_z, (total_core - 1) - x_wr, z_wr)
+
+	# bound on y; can be zero
+	y_rd = total_core - 1 - x_rd - z_rd
+	y_wr = total_core - 1 - x_wr - z_wr
+
+	terms['tCD_wr'] = first_wr + x_wr*D_WR + y_wr*D_RW + z_wr*D_RNK
+	terms['tCD_rd'] = first_rd + x_rd*D_WR + y_rd*D_RW + z_rd*D_RNK
+	return terms
+
+
+# RTAS-2013 (Yogen's Paper); M_r = cores/rank cores per rank
+def rtas_terms(mem, cores, rank):
+	cores = cores // rank
+
+	tIP = (ceil((rank*cores)/((mem.tBUS/mem.tCK)-1)) + (rank*cores) - 1)*mem.tCK
+	delta_IA = (ceil(rank/((mem.tBUS/mem.tCK)-1)) + rank - 1)*mem.tCK
+	tIA = (mem.tFAW - 4*mem.tRRD) + (cores-1)*mem.tRRD + cores*delta_IA
+	terms = tAC_parts(mem, tIP, tIA)
+
+	# tRWD and tWRD
+	tRWD = maximum(rank*(mem.tBUS+mem.tRTR), (mem.tRTW+mem.tWL-mem.tRL+mem.tBUS+mem.tRTR-1))
+	tWRD = maximum(rank*(mem.tBUS+mem.tRTR), (mem.tWTR+mem.tRL+2*mem.tBUS+mem.tRTR-1))
+
+	# tWD and tRD
+	tWD = mem.tRL + mem.tBUS - 1 + (rank)*(mem.tBUS + mem.tRTR)
+	tRD = maximum((mem.tRL+mem.tBUS-1+(rank)*(mem.tBUS+mem.tRTR)), (mem.tWTR+mem.tRL+2*mem.tBUS+mem.tRTR-1))
+
+	terms['tCD_wr'] = ceil((cores-1)/2.0)*tRWD + floor((cores-1)/2.0)*tWRD + (cores%2)*tWD + (1-cores%2)*tRD
+	terms['tCD_rd'] = floor((cores-1)/2.0)*tRWD + ceil((cores-1)/2.0)*tWRD + (cores%2)*tRD + (1-cores%2)*tWD
+	return terms
+
+
+# terms of a model for a device (a Device or a DeviceGrid), cores in total and ranks
+def model_terms(model, mem, cores, ranks=1, intlv=2):
+	if model == 'AMC':
+		return amc_terms(mem, cores, intlv)
+	elif model == 'RTSS':
+		return rtss_terms(mem, cores)
+	elif model == 'RTAS':
+		return rtas_terms(mem, cores, ranks)
+	elif model == 'THESIS':
+		return thesis_terms(mem, cores, ranks)
+	raise ValueError("Unknown WCET model " + model)
+
+
+# average WCET of a single request for a row hit and write ratio (wcet-syn.py), from the terms of model
+def request_wcet(model, terms, tWTR, row_ratio, wr_ratio=0, intlv=2):
+	rd_ratio = 1 - wr_ratio
+
+	if model == 'AMC':
+		return rd_ratio*terms['t_R'] + (wr_ratio)*terms['t_W']
+
+	# worst cumulative pattern using the greedy approach of Section VI of the RTSS paper
+	tAC_wr, tAC_c_rd = terms['tAC_wr'], terms['tAC_c_rd']
+	task_CD = rd_ratio*terms['tCD_rd'] + wr_ratio*terms['tCD_wr']
+	task_AC = (1-row_ratio)*(tAC_c_rd)
+
+	wr_first = task_AC + (tAC_wr - tAC_c_rd)*(1-row_ratio) + tWTR*(wr_ratio - (1-row_ratio))
+	wr_only = task_AC + (tAC_wr - tAC_c_rd)*(wr_ratio)
+	wtr_first = task_AC + tWTR*(row_ratio*rd_ratio) + (tAC_wr - tAC_c_rd)*(wr_ratio - row_ratio*rd_ratio)
+	wtr_only = task_AC + tWTR*wr_ratio
+
+	task_AC = where((tAC_wr - tAC_c_rd) >= tWTR,
+			where(wr_ratio > (1-row_ratio), wr_first, wr_only),
+			where(wr_ratio > row_ratio*rd_ratio, wtr_first, wtr_only))
+
+	return task_AC + task_CD*intlv
+
+
+# terms of a model, each a labeled array over (device, cores, ranks)
+def grid_terms(model, devices, cores, ranks, intlv=2):
+	mem = DeviceGrid(devices)
+	M = numpy.array(cores).reshape(1, -1, 1)
+	R = numpy.array(ranks).reshape(1, 1, -1)
+	terms = model_terms(model, mem, M, R, intlv)
+
+	axes = [('device', mem.devices), ('cores', list(cores)), ('ranks', list(ranks))]
+	return dict((name, LabeledArray(value, axes)) for name, value in terms.items())
+
+
+# average WCET of a single request (wcet-syn.py) over (device, cores, ranks, row)
+def grid_wcet(model, devices, cores, ranks, rows, intlv=2, wr_ratio=0):
+	terms = dict((name, t.values[..., None]) for name, t in grid_terms(model, devices, cores, ranks, intlv).items())
+	tWTR = DeviceGrid(devices, 4).tWTR
+	row_ratio = numpy.array(rows, dtype=float).reshape(1, 1, 1, -1)
+	axes = [('device', list(devices)), ('cores', list(cores)), ('ranks', list(ranks)), ('row', list(rows))]
+
+	return LabeledArray(request_wcet(model, terms, tWTR, row_ratio, wr_ratio, intlv), axes)
+
+
+def main():
+	from sweep import ALL_DEVICES, DEFAULT_DEVICES
+
+	parser = argparse.ArgumentParser(description='Evaluate a WCET model over the whole design space at once',
+	                                epilog="Example Usage: ./WCETModels.py --all -o results/syn.json",
+	                                usage='%(prog)s [options]')
+	parser.add_argument('-m', '--model', choices=MODELS, default='RTAS', help="WCET model (wcet-syn.py prints RTAS)")
+	parser.add_argument('-a', '--all', action="store_true", default=False, help="All devices and latencies (run_all)")
+	parser.add_argument('-o', '--output', default=None, help="Output file (default results/syn.json)")
+	parser.add_argument('-c', '--cores', type=int, nargs='+', default=[4, 16], help="Core counts")
+	parser.add_argument('-r', '--ranks', type=int, nargs='+', default=[2, 4], help="Rank counts")
+	parser.add_argument('--row', type=float, nargs='+', default=[0, 0.25, 0.5, 0.75, 1], help="Row hit ratios")
+	parser.add_argument('-i', '--intlv', type=int, default=2, help="Number of banks interleaved")
+	parser.add_argument('-w', '--write', type=float, default=0, help="Write ratio")
+	args = parser.parse_args()
+
+	if numpy is None:
+		parser.error("the grid evaluation needs numpy")
+
+	devices = ALL_DEVICES if args.all else DEFAULT_DEVICES
+	wcet = grid_wcet(args.model, devices, args.cores, args.ranks, args.row, args.intlv, args.write)
+
+	out_name = args.output or os.path.join('results', 'syn.json')
+	if os.path.dirname(out_name) and not os.path.isdir(os.path.dirname(out_name)):
+		os.makedirs(os.path.dirname(out_name))
+
+	# same records as ./sweep.py syn; the file holds one run, a rerun replaces it
+	out_file = open(out_name, 'w')
+	done = 0
+	for point, value in wcet.items():
+		dev, RL, WL = point.pop('device')
+		point.update(tool='syn', model=args.model, device=dev, RL=RL, WL=WL, result=float(value))
+		out_file.write(json.dumps(point, sort_keys=True) + '\n')
+		done += 1
+	out_file.close()
+
+	print str(done) + " points written to " + out_name
+
+
+
+if __name__ == '__main__': main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+""" Simulator throughput benchmark: runs sim-RTSS.py, wcet-bmark.py, the wcet-syn models
+	(WCETModels.py) and sim-AMC.py at fixed configurations on synthetic traces generated from a fixed
+	seed, and reports the speed (simulated cycles, analysed requests, grid points or simulated ns per
+	second) and the peak memory of every point. Every point runs in its own process so its peak
+	memory is its own.
+
+	The results can be saved as a baseline; later runs are compared against it and a point that got
+	slower or bigger by more than the tolerance, or whose result changed, is a regression.
+
+	Example Usage: ./bench.py --save     (record the baseline)
+	               ./bench.py            (compare against it, exit status 1 on a regression) """
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import subprocess
+import TraceGen
+import TraceCache
+import DeviceRegistry
+
+__metaclass__ = type
+
+# Parse command line arguments
+parser = argparse.ArgumentParser(description='Measure the speed and memory of the simulators on fixed synthetic workloads',
+                                epilog="Example Usage: ./bench.py --save",
+                                usage='%(prog)s [options]')
+
+parser.add_argument('-b', '--baseline', default=os.path.join('results', 'bench-baseline.json'), help="Baseline file")
+parser.add_argument('-s', '--save', action="store_true", default=False, help="Save the results as the new baseline")
+parser.add_argument('-t', '--tolerance', type=float, default=0.15, help="Allowed slowdown / memory growth (fraction)")
+parser.add_argument('-n', '--requests', type=int, default=1000, help="Requests of the core under analysis at 4 cores (scaled down with more cores)")
+parser.add_argument('-r', '--repeat', type=int, default=1, help="Runs per point, the fastest one counts")
+parser.add_argument('--tools', nargs='+', choices=['sim', 'bmark', 'syn', 'amc'], default=['sim', 'bmark', 'syn', 'amc'], help="Benchmarks to run")
+
+
+path = os.path.dirname(os.path.abspath(__file__))
+
+DEVICE = ("DDR3-1333H", 9, 7)
+SEED = 1
+
+SIM_CORES = [4, 16, 64]
+SIM_RANKS = [1, 2, 4, 8]
+SIM_MIXES = ['ooo', 'inorder']	#interference cores out of order / all cores in order
+BMARK_REQUESTS = 20000
+AMC_TASKS = [64, 256]
+
+
+# write a synthetic "addr type delta" trace of n random requests (TraceGen.py): a request stays in
+# the row of the one before with probability row_hit, is a write with probability write and follows
+# it by delta cycles
+def write_trace(name, n, seed, row_hit, write, delta):
+	out_file = open(name, 'w')
+	TraceGen.Stream('random', n, row_hit, write, delta, seed=seed).write_text(out_file)
+	out_file.close()
+
+
+# write a sim-AMC trace of n reads whose gaps are multiples of two accesses (2 x 49.5) of up to
+# 99 x gaps, so that many tasks get ready at the same time and the round robin tie-break is exercised
+def write_tie_trace(name, n, seed, gaps):
+	out_file = open(name, 'w')
+	for addr, memType, delta in TraceGen.Stream('random', n, 0.0, 0.0, (0, gaps), seed=seed):
+		out_file.write("%08x READ %d\n" % (addr, 99 * delta))
+	out_file.close()
+
+
+# generate the traces of all the points into tmp_dir; the same seed always gives the same traces
+def make_traces(tmp_dir, requests, tools):
+	seed = SEED
+	traces = {}
+	for cores in SIM_CORES:
+		n = max(1, requests * 4 / cores)
+		traces['app', cores] = os.path.join(tmp_dir, 'app-%d' % cores)
+		write_trace(traces['app', cores], n, seed, 0.5, 0.3, (10, 60))
+		traces['bomb', cores] = os.path.join(tmp_dir, 'bomb-%d' % cores)
+		write_trace(traces['bomb', cores], n, seed+1, 0.2, 0.5, (0, 0))
+		seed += 2
+	traces['bmark'] = os.path.join(tmp_dir, 'bmark')
+	write_trace(traces['bmark'], BMARK_REQUESTS, seed, 0.5, 0.3, (0, 50))
+
+	# sim-AMC: a task and tasks-1 others, each with its own gaps (of about two rounds on average), the
+	# others twice as long so that they don't restart before the task ends
+	if 'amc' in tools:
+		for tasks in AMC_TASKS:
+			for i in xrange(tasks):
+				seed += 1
+				traces['amc', tasks, i] = os.path.join(tmp_dir, 'amc-%d-%d' % (tasks, i))
+				write_tie_trace(traces['amc', tasks, i], requests if i == 0 else 2 * requests, seed, 2 * tasks)
+	return traces
+
+
+# sum of the WCET of the points written by WCETModels.py to out_name
+def syn_result(out_name):
+	results = [json.loads(line)['result'] for line in open(out_name)]
+	return "%d points, sum %r" % (len(results), sum(results))
+
+
+# list of points: (name, script, arguments, unit, function from the output to the work done,
+# function from the output to the result compared against the baseline)
+def make_points(args, tmp_dir, traces):
+	dev, RL, WL = DEVICE
+	device_file = os.path.join(path, 'devices', dev + '.txt')
+	tCK = DeviceRegistry.get_device(dev, RL, WL).tCK
+	points = []
+
+	# sim-RTSS.py: work is the number of simulated cycles
+	if 'sim' in args.tools:
+		for cores in SIM_CORES:
+			for ranks in SIM_RANKS:
+				if ranks > cores:
+					continue
+				for mix in SIM_MIXES:
+					list_name = os.path.join(tmp_dir, 'list-%d-%d' % (cores, ranks))
+					list_file = open(list_name, 'w')
+					list_file.write('\n'.join([traces['bomb', cores]] * (cores-1) + [traces['app', cores]]) + '\n')
+					list_file.close()
+					cmd = [list_name, device_file, str(RL), str(WL), '-c', str(cores), '-b', str(cores/ranks), '-r', str(ranks),
+						'--inorder', str(1 if mix == 'ooo' else cores)]
+					points.append(("sim c%d r%d %s" % (cores, ranks, mix), 'sim-RTSS.py', cmd, 'cycles/s',
+							lambda out: float(out) / tCK, str))
+
+	# wcet-bmark.py: work is the number of analysed requests (all four models in one pass)
+	if 'bmark' in args.tools:
+		for cores, ranks in [(4, 4), (16, 4)]:
+			for sig in [False, True]:
+				cmd = [traces['bmark'], device_file, str(RL), str(WL), '-c', str(cores), '-b', '8', '-r', str(ranks),
+					'-w', 'AMC', 'RTSS', 'RTAS', 'THESIS'] + (['-s'] if sig else [])
+				points.append(("bmark c%d r%d%s" % (cores, ranks, ' sig' if sig else ''), 'wcet-bmark.py', cmd, 'requests/s',
+						lambda out: float(BMARK_REQUESTS), str))
+
+	# wcet-syn models: work is the number of grid points
+	if 'syn' in args.tools:
+		for model in ['RTAS', 'THESIS']:
+			out_name = os.path.join(tmp_dir, 'syn-' + model)
+			cmd = ['--all', '-m', model, '-c', '4', '8', '16', '32', '64', '-r', '1', '2', '4', '8', '-o', out_name]
+			points.append(("syn all " + model, 'WCETModels.py', cmd, 'points/s', lambda out: float(out.split()[0]),
+					lambda out, out_name=out_name: syn_result(out_name)))
+
+	# sim-AMC.py: work is the simulated time; the result is compared against the baseline, so a change in
+	# the service order (the round robin tie-break) shows up as a changed result
+	if 'amc' in args.tools:
+		for tasks in AMC_TASKS:
+			cmd = [str(tasks)] + [traces['amc', tasks, i] for i in xrange(tasks)]
+			points.append(("amc t%d ties" % tasks, 'sim-AMC.py', cmd, 'ns/s', float, str))
+
+	return points
+
+
+# the first run on a trace builds its caches (the TraceCache .cache and the wcet-bmark signature index
+# .sig.cache), build them all up front so that every timed run, the first repeat included, starts warm
+def warm_caches(traces, points):
+	for name in traces.values():
+		TraceCache.load(name)
+	for name, script, cmd, unit, work, result in points:
+		if script == 'wcet-bmark.py' and '-s' in cmd:
+			measure(script, cmd)
+
+
+# run a point in a child reaped with wait4, so its peak memory is its own; returns the exit status,
+# the output, the wall time and the peak memory (MB)
+def measure(script, cmd):
+	out_file = tempfile.TemporaryFile()
+	start = time.time()
+	proc = subprocess.Popen([sys.executable, os.path.join(path, script)] + cmd,
+				stdout=out_file, stderr=subprocess.STDOUT, cwd=path)
+	pid, status, usage = os.wait4(proc.pid, 0)
+	wall = time.time() - start
+
+	# already reaped; decode the wait status as subprocess does (-signal if killed)
+	if os.WIFSIGNALED(status):
+		proc.returncode = -os.WTERMSIG(status)
+	else:
+		proc.returncode = os.WEXITSTATUS(status)
+
+	out_file.seek(0)
+	out = out_file.read().strip()
+	out_file.close()
+	return proc.returncode, out, wall, usage.ru_maxrss / 1024.0
+
+
+# print a point, compared to its baseline if there is one; returns 1 if it is a regression
+def report(name, result, base, tolerance=0):
+	if 'error' in result:
+		print "%-24s failed: %s" % (name, result['error'].splitlines()[-1] if result['error'] else '')
+		return 1
+
+	line = "%-24s %12.0f %-10s %8.1f MB" % (name, result['speed'], result['unit'], result['peak'])
+	if base is None:
+		print line
+		return 0
+
+	problems = []
+	if 'error' in base:
+		problems.append("baseline failed")
+	else:
+		line += "   %5.2fx speed %5.2fx memory" % (result['speed'] / base['speed'], result['peak'] / base['peak'])
+		if result['speed'] < base['speed'] * (1 - tolerance):
+			problems.append("slower")
+		if result['peak'] > base['peak'] * (1 + tolerance):
+			problems.append("bigger")
+		if result['result'] != base['result']:
+			problems.append("result changed: " + base['result'] + " -> " + result['result'])
+	print line + ("   REGRESSION (" + ", ".join(problems) + ")" if problems else "")
+	return 1 if problems else 0
+
+
+def main():
+	args = parser.parse_args()
+
+	# the workloads depend on --requests, a baseline taken with another one can't be compared
+	baseline = None
+	if not args.save:
+		if not os.path.exists(args.baseline):
+			print "no baseline " + args.baseline + ", run with --save first"
+			sys.exit(1)
+		baseline = json.load(open(args.baseline))
+		if baseline['requests'] != args.requests:
+			print "baseline " + args.baseline + " was taken with --requests " + str(baseline['requests'])
+			sys.exit(1)
+
+	tmp_dir = tempfile.mkdtemp(prefix='bench-')
+
+	try:
+		traces = make_traces(tmp_dir, args.requests, args.tools)
+		points = make_points(args, tmp_dir, traces)
+		warm_caches(traces, points)
+
+		results = {}
+		for name, script, cmd, unit, work, result in points:
+			best = None
+			for i in xrange(max(1, args.repeat)):
+				status, out, wall, peak = measure(script, cmd)
+				if status != 0:
+					best = dict(error=out)
+					break
+				value = result(out)
+				if best is None or wall < best['wall']:
+					best = dict(result=value, wall=wall, speed=work(out) / wall, unit=unit, peak=peak)
+			results[name] = best
+			report(name, best, None)
+	finally:
+		shutil.rmtree(tmp_dir)
+
+	if args.save:
+		if os.path.dirname(args.baseline) and not os.path.isdir(os.path.dirname(args.baseline)):
+			os.makedirs(os.path.dirname(args.baseline))
+		out_file = open(args.baseline, 'w')
+		json.dump(dict(requests=args.requests, points=results), out_file, sort_keys=True, indent=1)
+		out_file.close()
+		print "baseline written to " + args.baseline
+		return
+
+	print ""
+	print "compared to " + args.baseline + " (tolerance " + str(args.tolerance) + "):"
+	regressions = 0
+	for name in sorted(results):
+		if name in baseline['points']:
+			regressions += report(name, results[name], baseline['points'][name], args.tolerance)
+
+	if regressions > 0:
+		print str(regressions) + " regressions"
+		sys.exit(1)
+	print "no regressions"
+
+
+
+if __name__ == '__main__': main()
@@ -10,10 +10,12 @@
 	running it in atomic mode in the gem5 simulator (i.e memory takes 0 time) """
 
 import sys
-import re
 import random
+import heapq
+import bisect
 import argparse
 from math import *
+import TraceCache
 
 # Parse command line arguments
 parser = argparse.ArgumentParser(description='Take number of tasks and traces for each tasks',
@@ -37,93 +39,115 @@ infiles = args.inputs
 
 mem_access_time = 49.5 #tRC for DDR3-1333H
 current_time = 0
-round_robin_index = 0
-new_rr_index = 0
-
-
-
-# Define function to search for smallest item in list
-def find_smallest(l):
-        """Function to find the smallest item in list 'l' and return the index of the item """
-
-        x = l[0]
-        for elem in l:
-                if elem < x:
-                        x = elem
-        #print "Servicing Task {} FCFS".format(l.index(x))
-        return l.index(x)
-
-# Define function to find next item in list - Round Robin Scheme
-def find_next(l):
-        """Function to find the next item in the list to be serviced and return the index of the item"""
-        global round_robin_index
-        global new_rr_index
-
-        # If the timestamp for the task is less than current time, then we can service it
-        if l[round_robin_index] <= current_time:
-                
-                # Update the index to the next element to be serviced
-                if round_robin_index < num_tasks-1:
-                        round_robin_index += 1
-                        #print "Servicing Task {} in case one".format(round_robin_index-1)
-                        return round_robin_index-1
-                else:
-                        round_robin_index = 0
-                        #print "Servicing Task {} in case one".format(num_tasks-1)
-                        return num_tasks-1
-
-        # Else we need to search for the next element that is less than current time
-        # But if all the tasks are greater than the current time, then we need to find the
-        # smallest one. If two or more have equal smallest time, then we need to pick the one
-        # that is congruent with the RR order (Basically find the next smallest one in RR order)
-        else:
 
-                # Set the current one as the smallest and compare others against it
-                s = l[round_robin_index]
-                next_index = round_robin_index
-                new_rr_index = round_robin_index
-                while True:
-                    # The next one to compare it against the current smallest
-                    if next_index < num_tasks - 1:
-                        next_index += 1
-                    else:
-                        next_index = 0
-
-                    # Once we search all the elements, then terminate
-                    if next_index == round_robin_index:
-                        break
-
-                    # Compare the value (must be strictly less than to maintain RR order)
-                    if l[next_index] < s:
-                        s = l[next_index]
-                        new_rr_index = next_index
-
-
-                # Set the next next round_robin index and return the one to be serviced next
-                if new_rr_index < num_tasks -1:
-                        round_robin_index = new_rr_index + 1
-                else:
-                        round_robin_index = 0
 
-                #print "Servicing Task {}: HEREEEE!!!".format(new_rr_index)
-                return new_rr_index
 
-
-# Read the first line of file before entering main loop
-line = []
+# Arbiter that picks the next task to service, keeping the tasks in buckets per ready time (sorted by
+# task) and the ready times in a heap
+class Arbiter:
+
+        def __init__(self, time):
+                self.time = time        # ready time of each task; only the task picked last may change it
+                self.num = len(time)
+                self.index = 0          # round robin index
+                self.__file_all()
+                self.changed = []       # tasks picked since the buckets were last used, their times may be new
+                self.is_changed = [False] * self.num
+
+        def __file_all(self):
+                """Put every task in the bucket of its ready time"""
+                self.tasks = {}         # ready time -> tasks with that time, in ascending order
+                for i, t in enumerate(self.time):
+                        self.tasks.setdefault(t, []).append(i)
+                self.heap = list(self.tasks)
+                heapq.heapify(self.heap)
+                self.filed = list(self.time)    # ready time each task is filed under
+
+        def __picked(self, s):
+                """Remember that the ready time of task s changes once it is serviced"""
+                if not self.is_changed[s]:
+                        self.is_changed[s] = True
+                        self.changed.append(s)
+
+        def __top(self):
+                """Return the smallest ready time and its bucket, dropping old heap entries"""
+                # when most tasks moved since the last look (all of them get serviced in turn under load)
+                # refiling all of them is cheaper than moving each one
+                if 4 * len(self.changed) > self.num:
+                        self.__file_all()
+                else:
+                        tasks = self.tasks
+                        for task in self.changed:
+                                t = self.time[task]
+                                old = self.filed[task]
+                                if t == old:
+                                        continue
+                                same = tasks[old]
+                                del same[bisect.bisect_left(same, task)]
+                                if not same:
+                                        del tasks[old]
+                                same = tasks.get(t)
+                                if same is None:
+                                        tasks[t] = [task]
+                                        heapq.heappush(self.heap, t)
+                                else:
+                                        bisect.insort(same, task)
+                                self.filed[task] = t
+                for task in self.changed:
+                        self.is_changed[task] = False
+                del self.changed[:]
+
+                # a time is left in the heap when its bucket empties, and pushed again if it refills
+                heap = self.heap
+                while heap[0] not in self.tasks:
+                        heapq.heappop(heap)
+                return heap[0], self.tasks[heap[0]]
+
+        def find_smallest(self):
+                """FCFS: the task with the smallest timestamp, the lowest index on a tie"""
+                s = self.__top()[1][0]
+                self.__picked(s)
+                return s
+
+        def find_next(self, current_time):
+                """Round Robin: the task at the RR index if it can be serviced by current time, otherwise the
+                smallest timestamp; two or more with equal smallest time go to the next one in RR order"""
+                s = self.index
+                if self.time[s] > current_time:
+                        t, same = self.__top()
+
+                        # the first tied task at or after the RR index, else the lowest one
+                        i = bisect.bisect_left(same, self.index)
+                        s = same[i] if i < len(same) else same[0]
+
+                # Set the next round_robin index and return the one to be serviced next
+                self.index = s + 1 if s < self.num - 1 else 0
+
+                # same as __picked, inlined since this runs for every access
+                if not self.is_changed[s]:
+                        self.is_changed[s] = True
+                        self.changed.append(s)
+                return s
+
+
+# Load the parsed traces and read the first line of each before entering main loop
+trace = []
+pos = []
 for i in range(num_tasks):
-        line.append(infiles[i].readline());
+        trace.append(TraceCache.load(infiles[i].name))
+        pos.append(1)
 
 
 # Get the first time stamp of each trace file
 time = []
 for i in range(num_tasks):
-        time.append( int(re.split('\W+', line[i])[2]) )
+        time.append( trace[i].delta(0) )
 #print time
 
 
 # Get number of transactions for mem-bombs
 data = [1] * num_tasks
+arbiter = Arbiter(time)
 
 
 # Loop until Hyper-Period has been reached...if EOF, wait until period to re-start again
@@ -131,11 +155,11 @@ while True:
 
         # Round Robin to find the next item to be serviced
         if args.round:
-                s = find_next(time)
+                s = arbiter.find_next(current_time)
 
         # FCFS Policy to find the item with smallest timestamp
         else:
-                s = find_smallest(time)
+                s = arbiter.find_smallest()
 
         # Update the current time
         if current_time < time[s]:
@@ -144,21 +168,20 @@ while True:
                 current_time = current_time + mem_access_time
 
         # Read the next input line of the task that we just serviced
-        line[s] = infiles[s].readline()
+        if pos[s] == len(trace[s]):
 
-        # If EOF reached for that task, then set the end_time and increment EOF_COUNTER and go back to beginning of file
-        if line[s] == "" or line[s] =='\n':
+            # If EOF reached for that task, then set the end_time and increment EOF_COUNTER and go back to beginning of file
             if s == 0:
                 break
             else:
-                infiles[s].seek(0,0)
-                line[s] = infiles[s].readline()
+                pos[s] = 1
                 data[s] += 1
 
                 #print "=========***** Task {} *****=========".format(s)
 
         else:
-                time[s] = int(re.split('\W+', line[s])[2]) + current_time
+                time[s] = trace[s].delta(pos[s]) + current_time
+                pos[s] += 1
                 data[s] += 1
 
 
@@ -2,12 +2,21 @@
 """ Simulation Test Bench """
 
 import sys
-import re
+import json
+import time
+import cProfile
 import random
 import argparse
 from math import *
 from MemCntlr import *
+import TraceCache
+import TraceGen
+import Checkpoint
+import DeviceRegistry
+from MultiChannel import MultiChannel
+from Profiler import PhaseProfiler
 from collections import deque
+from heapq import heappush, heappop
 
 __metaclass__ = type
 
@@ -16,7 +25,7 @@ parser = argparse.ArgumentParser(description='Take input constraints and outputs
                                 epilog="Example Usage: ./<progNam>.py trc.txt 4 5",
                                 usage='%(prog)s [options]')
 
-parser.add_argument('inputs', metavar="Trace-Files", type=file, help="File contains list of trc-file names")
+parser.add_argument('inputs', metavar="Trace-Files", type=file, help="File contains list of trc-file names (or gen: specs, see TraceGen.py)")
 parser.add_argument('timing', metavar="Timing-file", type=file, help="Input timing constraint for device")
 parser.add_argument('readlat', metavar="Read-Latency", type=int, help="Read Latency")
 parser.add_argument('writelat', metavar="Write-Latency", type=int, help="Write Latency")
@@ -25,9 +34,32 @@ parser.add_argument('-b', '--numbank', type=int, default=8, help="Number of Bank
 parser.add_argument('-m', '--mem', type=int, default=0, help="Memory Configuration")
 parser.add_argument('-r', '--rank', type=int, default=1, help="Number of ranks")
 parser.add_argument('-i', '--intlv', type=int, default=2, help="Number of banks interleaved")
+parser.add_argument('--inorder', type=int, default=1, help="Number of in-order cores (the last ones); the core under analysis is always in-order")
+parser.add_argument('--stagger-refresh', action="store_true", default=False, help="Refresh each rank on its own, spread over tREF, instead of all at once")
+parser.add_argument('-e', '--event', action="store_true", default=False, help="Skip idle cycles (event-driven mode)")
+parser.add_argument('--checkpoint', metavar="FILE", default=None, help="Write a checkpoint of the simulation to FILE at --at")
+parser.add_argument('--at', type=float, default=None, help="Simulated time (ns) at which the checkpoint is written")
+parser.add_argument('--restore', metavar="FILE", default=None, help="Resume from a checkpoint taken with the same configuration")
+parser.add_argument('--stats', metavar="FILE", default=None, help="Write the memory controller statistics to FILE as JSON")
+parser.add_argument('--profile', action="store_true", default=False, help="Time each phase of the simulation loop and print a breakdown to stderr")
+parser.add_argument('--cprofile', metavar="FILE", default=None, help="Run under cProfile and dump the pstats to FILE")
+parser.add_argument('--channels', type=int, default=1, help="Number of memory channels, each with its own controller")
+parser.add_argument('--chshift', type=int, default=6, help="Lowest address bit of the channel interleaving")
+parser.add_argument('--workers', action="store_true", default=False, help="Simulate each channel in its own process")
+parser.add_argument('-s', '--sample', type=int, nargs=2, metavar=('DETAIL', 'SKIP'), default=None,
+                    help="Sampled simulation: alternate DETAIL requests of the core under analysis simulated cycle by cycle with SKIP fast-forwarded ones; prints the estimate and its 95%% confidence interval")
 
 args = parser.parse_args()
 
+if (args.checkpoint is None) != (args.at is None):
+	parser.error("--checkpoint and --at must be used together")
+if args.sample is not None and (args.sample[0] < 1 or args.sample[1] < 0):
+	parser.error("--sample needs DETAIL >= 1 and SKIP >= 0")
+if args.profile and args.workers:
+	parser.error("--profile can not time channels running in --workers")
+if args.channels > 1 and (args.event or args.checkpoint or args.restore or args.sample or args.stats):
+	parser.error("--channels can not be combined with -e, --checkpoint, --restore, --sample or --stats")
+
 
 # Input arguments
 trc_file = args.inputs
@@ -40,6 +72,8 @@ num_bank = args.numbank
 num_rank = args.rank
 num_intlv = args.intlv
 mem_config = args.mem
+event_mode = args.event
+trace_names = trc_file.read().splitlines()
 
 if num_cores > num_rank*num_bank:
 	print "Error: # of cores can not exceed banks, please increase bank or decrease cores"
@@ -47,22 +81,46 @@ if num_cores > num_rank*num_bank:
 
 
 
-""" The core period is needed to convert all time to ns(unit) intead of cycles """
+""" The core period is needed to convert all time to ps(unit) intead of cycles """
 # Core object to represent each requestors
 class Core:
-	def __init__(self, trcFile, ID, inOrder, memCntlr, clock, period):
-		self.trcFile = trcFile
+	def __init__(self, trace, ID, inOrder, memCntlr, clock, period):
+		self.trace = trace	 #parsed trc file (TraceCache.TraceData) or generated stream (TraceGen.Stream)
+		self.pos = 0		 #index of the next line in the trace
 		self.coreID = ID 
 		self.inOrder = inOrder 	  #in order core or not
 		self.memCntlr = memCntlr  #attach mem contrl to core
 		self.clock = clock 		#reference to global clock
-		self.period = period	#period in nano-seconds
+		self.period = period	#period in pico-seconds
 
 		self.num_req_sent = 0	 #number of request sent
 		self.num_req_done = 0	 #number of request completed (i.e. recieved data)
 		self.prev_data_time = 0  #time when last data was recieved
 		self.end = False		 #flag to indictate end of trc file and hence end simulation
 		self.line = None		 #list to hold input line from trc file
+		self.rows = None		 #row of every line when the trace is premapped (see premap)
+		self.finish_time = None	 #time the data of the last line of the first pass through the trace came back
+		self.num_data = len(trace) * num_intlv	#data returned for one pass through the trace
+
+
+	# map the whole trace up front so the front end can skip mapping each request;
+	# rows only depend on the address, so cores on the same trace share them through rowCache
+	def premap(self, addrMap, rowCache):
+		if not hasattr(self.trace, 'addr_array'):
+			return	#generated streams are mapped request by request
+		rank, bank, row = addrMap.map_trace(self.trace.addr_array(), self.coreID)
+		self.rank = int(rank[0]) if len(rank) > 0 else 0
+		self.bank = int(bank[0]) if len(bank) > 0 else 0
+		if self.trace not in rowCache:
+			rowCache[self.trace] = row.tolist()
+		self.rows = rowCache[self.trace]
+
+
+	# the premapped rows are not written to a checkpoint, they are mapped again on restore
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state['rows'] = None
+		return state
 
 
 	# check if simulation has ended
@@ -72,26 +130,25 @@ class Core:
 
 	# make request object
 	def make_req(self):
-		return Request(self.line[0], self.line[1], self.coreID)
+		req = Request(self.line[0], self.line[1], self.coreID)
+		if self.rows is not None:
+			req.rank = self.rank
+			req.bank = self.bank
+			req.row = self.rows[self.pos-1]	#self.line is the line before pos
+			req.mapped = True
+		return req
 
 
 	# get the next line from trc file
 	def get_line(self):
-		# read the next input line from trace file
-		input_line = [0]
-		input_line[0] = self.trcFile.readline()
-
 		# If end of file reached, go to beginning and return None (null)
-		if input_line[0] == "" or input_line[0] =='\n':
-			self.trcFile.seek(0,0)
+		if self.pos == len(self.trace):
+			self.pos = 0
 			self.end = True
 			return
-		
-		addr = int(re.split('\W+', input_line[0])[0], base=16)
-		memType = str(re.split('\W+', input_line[0])[1])
-		time = int(re.split('\W+', input_line[0])[2])
 
-		self.line = [addr, memType, time]
+		self.line = self.trace.line(self.pos)
+		self.pos += 1
 
 
 	# send request to memory controller
@@ -124,57 +181,390 @@ class Core:
 				self.num_req_sent += 1
 				self.line = None
 
+	# earliest time at which send_req() can do anything (used by WakeQueue and event-driven mode)
+	def next_send(self):
+		# the next line is read in the cycle after a send, even if the request is still outstanding
+		if self.line is None and not (self.inOrder and self.end):
+			return self.clock.time
+
+		if self.inOrder:
+			# wait for the outstanding request
+			if self.end or self.num_req_sent != self.num_req_done:
+				return float('inf')
+			return self.prev_data_time + self.line[2]*self.period
+
+		# out of order core only waits when it reaches the outstanding limit
+		if self.num_req_sent - self.num_req_done <= 20:
+			return self.clock.time
+		return float('inf')
+
+	# time from a data coming back to the earliest send it can lead to, inf if it leads to none
+	# (used by the multi-channel system to run the cores ahead of the channels)
+	def data_delay(self):
+		if not self.inOrder:
+			return 0	#a data may free a slot of the outstanding limit
+		if self.end:
+			return float('inf')
+		return self.line[2]*self.period if self.line is not None else 0
+
 	# recieve updatea from memory controller
 	def recv_data(self, time):
 		self.prev_data_time = time
 		self.num_req_done += 1
+		if self.num_req_done == self.num_data:
+			self.finish_time = time
 		#print "Core " + str(self.coreID) + ": got " + str(self.num_req_done) + " @ " + str(self.clock.time)
 
+	# sampled simulation: consume up to n lines without sending them, only keeping the open row
+	# of the bank up to date; the core under analysis stops at the end of its trace
+	def skip(self, n, addrMap, bankState):
+		done = 0
+		while done < n:
+			if self.line is None:
+				self.get_line()
+				if self.line is None:
+					if self.inOrder:
+						break
+					continue
+			req = self.make_req()
+			if not req.mapped:
+				addrMap.get_target(req)
+			bankState.row_state(req)
+			self.line = None
+			done += 1
+		return done
+
+
+# Wake-up queue of the cores: a heap of the time at which each core can next send (Core.next_send),
+# so a cycle only calls send_req() on the cores that are due instead of polling all of them. A core
+# waiting for data is out of the queue until recv_data puts it back (update). Entries left behind
+# by an update are stale and dropped when they come up.
+class WakeQueue:
+	def __init__(self, requestors, clk):
+		self.requestors = requestors
+		self.clock = clk
+		self.reset()
+
+	# queue every core again, after their state changed outside send_req/recv_data
+	def reset(self):
+		self.heap = []
+		self.wake = [None] * len(self.requestors)	#time each core is queued for, None if it is not
+		for r in self.requestors:
+			self.update(r)
+
+	# (re)queue core r at the time it can next send
+	def update(self, r):
+		wake = r.next_send()
+		if wake == self.wake[r.coreID]:
+			return
+		if wake == float('inf'):
+			self.wake[r.coreID] = None
+			return
+		self.wake[r.coreID] = wake
+		heappush(self.heap, (wake, r.coreID))
+
+	# send_req() of the cores due at the current time, in core order as when polling all of them;
+	# a core that was due asks again at the earliest in the next cycle. Returns the cores that were due
+	def send(self):
+		heap = self.heap
+		now = self.clock.time
+		if not heap or heap[0][0] > now:
+			return ()
+
+		wake = self.wake
+		due = []
+		while heap and heap[0][0] <= now:
+			at, ID = heappop(heap)
+			if wake[ID] == at:
+				wake[ID] = None
+				due.append(ID)
+		due.sort()
+
+		for ID in due:
+			r = self.requestors[ID]
+			r.send_req()
+			self.update(r)
+		return due
+
+	# earliest time a core is due (inf if all of them wait for data)
+	def next_wake(self):
+		heap = self.heap
+		while heap and self.wake[heap[0][1]] != heap[0][0]:
+			heappop(heap)
+		return heap[0][0] if heap else float('inf')
+
+
+# Sampled simulation: detailed windows of the core under analysis alternate with functional
+# fast-forward intervals, in which only the trace positions and the open rows of the banks move.
+# The time of a skipped request is estimated by the mean time per request of the windows.
+class Sampler:
+	def __init__(self, detail, skip, requestors, MC, clk):
+		self.detail = detail		#requests of the core under analysis per detailed window
+		self.skip = skip			#requests of the core under analysis per fast-forward interval
+		self.requestors = requestors
+		self.core = requestors[-1]	#core under analysis
+		self.MC = MC
+		self.clock = clk
+
+		self.rates = []				#time per request of each complete window
+		self.detail_time = clk.time	#simulated time, including a restored checkpoint
+		self.skipped = 0			#requests of the core under analysis that were fast-forwarded
+		self.start_window()
+
+	def start_window(self):
+		self.start_time = self.clock.time
+		self.start_done = self.core.num_req_done
+		self.start_sent = [r.num_req_sent for r in self.requestors]
+		self.window_end = self.start_done + self.detail * num_intlv	#each request returns num_intlv data
+
+	# close the window (the core under analysis has nothing outstanding) and fast-forward
+	def window_done(self):
+		duration = self.clock.time - self.start_time
+		self.detail_time += duration
+		self.rates.append(float(duration) / self.detail)
+
+		if self.skip == 0:
+			self.start_window()
+			return
+
+		# the core under analysis moves by skip requests, the others by as many as they sent in
+		# the same time during the window
+		front = self.MC.front
+		skipped = self.core.skip(self.skip, front.addrMap, front.bankState)
+		self.skipped += skipped
+		tCK = self.MC.device.tCK
+		jump = int(round(skipped * self.mean() / tCK)) * tCK
+		for i, r in enumerate(self.requestors[:-1]):
+			rate = float(r.num_req_sent - self.start_sent[i]) / duration
+			r.skip(int(round(rate * jump)), front.addrMap, front.bankState)
+
+		for data in self.MC.skip_to(self.clock.time + jump):
+			self.requestors[data.coreID].recv_data(data.time)
+		self.core.prev_data_time = self.clock.time	#next request waits its own compute time
+		self.start_window()
+
+	# the end of the trace was reached inside a window
+	def finish(self):
+		self.detail_time += self.clock.time - self.start_time
+
+	def mean(self):
+		return sum(self.rates) / len(self.rates)
+
+	# estimated execution time and half width of its 95% confidence interval
+	def estimate(self):
+		if self.skipped == 0:
+			return self.detail_time, 0.0
+		n = len(self.rates)
+		if n < 2:
+			return self.detail_time + self.skipped * self.mean(), float('inf')
+		mean = self.mean()
+		var = sum((r - mean) ** 2 for r in self.rates) / (n - 1)
+		return self.detail_time + self.skipped * mean, 1.96 * self.skipped * sqrt(var / n)
+
 
 # create an array of Core object for each input trace file
-def create_requestors(memCntlr, clk, period):
+def create_requestors(memCntlr, clk, period, addrMap):
 	#trc_file contains list of file names, each are traces for a benchmark
 	coreID = 0
 	cores = []
-	line = trc_file.read().splitlines() 
-	
-	if len(line) != num_cores:
+	rowCache = {}	#TraceData -> premapped rows, shared by the cores running the same trace
+
+	if len(trace_names) != num_cores:
 		print "num cores must equal to num of lines in input trc file"
 		exit(1)
 
-	for f in line:
-		file_obj = open(f, 'r')
+	for f in trace_names:
+		if TraceGen.is_spec(f):
+			trace = TraceGen.parse(f)	#every core gets its own stream, generated as it goes
+		else:
+			trace = TraceCache.load(f)	#duplicated interference traces come back as one shared TraceData
 
-		# the last file is the core under analysis, so make it in-order
-		if coreID == num_cores-1:
-			cores.append(Core(file_obj, coreID, True, memCntlr, clk, period))
+		# the last file is the core under analysis, so make it in-order (and the --inorder-1 before it)
+		if coreID >= num_cores - max(1, args.inorder):
+			cores.append(Core(trace, coreID, True, memCntlr, clk, period))
 		else:
-			cores.append(Core(file_obj, coreID, False, memCntlr, clk, period))
+			cores.append(Core(trace, coreID, False, memCntlr, clk, period))
+
+		# numpy is optional; without it each request is mapped by the front end
+		if numpy is not None:
+			cores[coreID].premap(addrMap, rowCache)
 		coreID += 1
 
 	return cores
 
 
-def main():
+# configuration a checkpoint is taken with; a checkpoint can only be restored with the same one
+def sim_config():
+	return dict(traces=trace_names, device=DeviceRegistry.device_name(time_file.name), RL=RL, WL=WL,
+			cores=num_cores, bank=num_bank, rank=num_rank, mem=mem_config, intlv=num_intlv, stagger=args.stagger_refresh)
+
+
+# write clock, memory controller and cores to a checkpoint
+def save_state(path, clk, MC, requestors):
+	config = sim_config()
+	config['time'] = to_ns(clk.time)
+	Checkpoint.save(path, config, (clk, MC, requestors))
 
-	# create clock
+
+# load clock, memory controller and cores from a checkpoint
+def restore_state(path):
+	config = Checkpoint.load_config(path)
+	for key, value in sim_config().iteritems():
+		if config[key] != value:
+			print "Error: checkpoint " + path + " was taken with " + key + " = " + str(config[key]) + ", not " + str(value)
+			exit(1)
+
+	config, (clk, MC, requestors) = Checkpoint.load(path)
+
+	# premap again what the checkpoint left out
+	if numpy is not None:
+		rowCache = {}
+		for r in requestors:
+			r.premap(MC.front.addrMap, rowCache)
+
+	return clk, MC, requestors
+
+
+# phases timed by --profile: the methods of the simulation loop, with the phases of the memory
+# controller nested in MemController.simulate (or in MultiChannel.sync with several channels)
+def profile_phases(profiler):
+	profiler.wrap(WakeQueue, 'send')
+	profiler.wrap(Core, 'send_req', parent='WakeQueue.send')
+	if args.channels > 1:
+		profiler.wrap(MultiChannel, 'sync')
+		profiler.wrap(MemController, 'simulate', parent='MultiChannel.sync')
+		profiler.wrap(MultiChannel, 'get_data')
+	else:
+		sim = 'MemController.simulate'
+		profiler.wrap(MemController, 'simulate')
+		profiler.wrap(FrontEnd, 'commandGen', parent=sim)
+		profiler.wrap(BackEnd, 'addCommands', parent=sim)
+		profiler.wrap(BackEnd, 'addToFIFO', parent=sim)
+		profiler.wrap(BackEnd, 'issue', parent=sim)
+		profiler.wrap(MemController, 'refresh', parent=sim)
+		profiler.wrap(MemController, 'get_data')
+		profiler.wrap(MemController, 'advance')
+	profiler.wrap(Core, 'recv_data')
+
+
+# print the --profile breakdown of the simulation loop that started at wall time start
+def report_profile(profiler, start, simulated):
+	sys.stderr.write(profiler.report(time.time() - start, to_ns(simulated)) + "\n")
+
+
+# multi-channel mode: the cores run ahead of the channels, which are then caught up (see MultiChannel)
+def run_channels(profiler):
 	clk = Clock()
-	period = 1 #since all simulation from Gem5 is done w/ 1GHZ; can change otherwise
+	period = to_ticks(1)
+	MC = MultiChannel(time_file, RL, WL, num_bank, num_rank, num_cores, mem_config, clk, num_intlv,
+			args.channels, args.chshift, args.workers, args.stagger_refresh)
+	requestors = create_requestors(MC, clk, period, MC.addrMap)
+	core = requestors[num_cores-1]	#core under analysis
+	queue = WakeQueue(requestors, clk)
+	wake = queue.wake
+	start = time.time()
+
+	done = False
+	while not done:
+		# up to the horizon the cores get their data as usual. Past it they run on while none of them
+		# could have sent on a data that is not known yet: a core waiting for data (out of the wake
+		# queue) sends at the earliest its data delay after the cycle following the horizon
+		horizon = MC.horizon
+		end = horizon + MC.tCK
+		while clk.time < end:
+			due = queue.send()
+			if clk.time == horizon:
+				end = MC.sync_limit()
+				due = xrange(num_cores)		#all the cores waiting by now
+			if clk.time >= horizon:
+				for ID in due:
+					if wake[ID] is None:
+						end = min(end, horizon + MC.tCK + requestors[ID].data_delay())
+
+			clk.time += MC.tCK
+
+			# at most one data per channel in a cycle
+			for data in MC.get_data():
+				r = requestors[data.coreID]
+				r.recv_data(data.time)
+				queue.update(r)
+
+			if core.sim_end():
+				done = True
+				break
+		if done and clk.time <= horizon:
+			break
+
+		# hand out the data of the cycles past the horizon the cores already ran, up to the end of the
+		# simulation if it is in them
+		late = MC.sync()
+		for i, data in enumerate(late):
+			if done and data.time > clk.time:
+				break
+			r = requestors[data.coreID]
+			r.recv_data(data.time)
+			queue.update(r)
+			if not done and core.sim_end() and (i+1 == len(late) or late[i+1].time > data.time):
+				clk.time = data.time
+				done = True
+	MC.close()
+
+	if profiler is not None:
+		report_profile(profiler, start, clk.time)
+
+	# execution time, then the completion time of each core (- if it did not get through its trace)
+	print to_ns(clk.time)
+	for r in requestors:
+		print "core" + str(r.coreID) + ": " + (str(to_ns(r.finish_time)) if r.finish_time is not None else "-")
+
+
+def main():
+
+	profiler = None
+	if args.profile:
+		profiler = PhaseProfiler()
+		profile_phases(profiler)
 
-	# create memory controller
-	MC = MemController(time_file, RL, WL, num_bank, num_rank, num_cores, mem_config, clk, num_intlv)
+	if args.channels > 1:
+		run_channels(profiler)
+		return
 
-	# create requestors for all input trc files
-	requestors = create_requestors(MC, clk, period)
+	if args.restore is not None:
+		clk, MC, requestors = restore_state(args.restore)
+	else:
+		# create clock
+		clk = Clock()
+		period = to_ticks(1) #since all simulation from Gem5 is done w/ 1GHZ; can change otherwise
+
+		# create memory controller
+		MC = MemController(time_file, RL, WL, num_bank, num_rank, num_cores, mem_config, clk, num_intlv, args.stagger_refresh)
+
+		# create requestors for all input trc files
+		requestors = create_requestors(MC, clk, period, MC.front.addrMap)
+
+	# time of the checkpoint, if one has to be written
+	ckpt_time = to_ticks(args.at) if args.checkpoint is not None else float('inf')
+
+	sampler = None
+	if args.sample is not None:
+		sampler = Sampler(args.sample[0], args.sample[1], requestors, MC, clk)
+	core = requestors[num_cores-1]	#core under analysis
+	queue = WakeQueue(requestors, clk)
+	start = time.time()
+	start_time = clk.time
 
 
 
 	# being simulation
 	while(1):
 
-		# send requests from cpu to memory
-		for r in requestors:
-			r.send_req()
+		# write the checkpoint once, between two cycles
+		if clk.time >= ckpt_time:
+			save_state(args.checkpoint, clk, MC, requestors)
+			ckpt_time = float('inf')
+
+		# send requests from cpu to memory (only the cores that are due)
+		queue.send()
 
 		# simulate for one cycle
 		MC.simulate()
@@ -182,18 +572,46 @@ def main():
 		# recieve data or ack from memory for request completed
 		data = MC.get_data()
 		if data is not None:
-			requestors[data.coreID].recv_data(data.time)
+			r = requestors[data.coreID]
+			r.recv_data(data.time)
+			queue.update(r)
 
 		# simulation ended? core under analysis is the last one
-		if requestors[num_cores-1].sim_end():
+		if core.sim_end():
 			break
 
+		# sampled mode: fast-forward once the core under analysis finished its window
+		if sampler is not None and core.num_req_done >= sampler.window_end:
+			sampler.window_done()
+			queue.reset()
+			if core.sim_end():
+				break
+
+		# jump over the cycles in which nothing can change; only look for them after
+		# a cycle that did nothing since busy cycles tend to come in a row. A refresh of
+		# all ranks is jumped over in cycle mode too, it stops nothing but the controller
+		if MC.idle and (event_mode or MC.ref_end is not None and MC.all_refreshing()):
+			MC.advance(min(queue.next_wake(), ckpt_time))
+
 	# end of simulation
 	#print ""
 	#print "========END OF SIMULATION========="
 	#print "--Total Request Completed: " + "		"+ str(requestors[num_cores-1].num_req_sent)
 	#print "--Total Execution Time: " + "		" + str(clk.time) + " ns"
-	print clk.time
+	if profiler is not None:
+		report_profile(profiler, start, clk.time - start_time)
+
+	if args.stats is not None:
+		stats_file = open(args.stats, 'w')
+		json.dump(MC.get_stats(), stats_file, sort_keys=True)
+		stats_file.close()
+
+	if sampler is not None:
+		sampler.finish()
+		estimate, half_width = sampler.estimate()
+		print str(to_ns(estimate)) + " +- " + str(to_ns(half_width))
+	else:
+		print to_ns(clk.time)
 	#print "{0:.2f}      		{1:.2f}".format(clk.time, float(requestors[num_cores-2].num_req_done*64)/(clk.time*0.001))
 
 # DONE: Refresh: 1) insert ACT infront of every CAS at the head of cmdQ and 2) Squash all PRE at head of cmdQ and 3) reset all bank and rank openROW to -1; don't need to update nextTime params...i dont think
@@ -208,6 +626,10 @@ def main():
 
 
 
-if __name__ == '__main__': main()
+if __name__ == '__main__':
+	if args.cprofile is not None:
+		cProfile.run('main()', args.cprofile)
+	else:
+		main()
 
 
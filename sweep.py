@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+""" Experiment sweep runner: expands the same (device, RL, WL, cores, ranks, benchmark) grids as the
+	old run scripts and runs every point as its own process on a pool sized to the machine.
+	Each point gets its own trace list file, so points never share state and can run in parallel.
+
+	Results are written as one JSON object per line, keyed by the configuration of the point.
+
+	Example Usage: ./sweep.py rtss --all -j 64 -o results/rtss.json """
+
+import os
+import sys
+import json
+import tempfile
+import argparse
+import subprocess
+import multiprocessing
+
+__metaclass__ = type
+
+# Parse command line arguments
+parser = argparse.ArgumentParser(description='Run a grid of simulations/WCET analyses in parallel',
+                                epilog="Example Usage: ./sweep.py rtss --all -j 64",
+                                usage='%(prog)s [options]')
+
+parser.add_argument('tool', metavar="Tool", choices=['rtss', 'test', 'bmark', 'syn', 'amc'],
+                    help="Grid to run: rtss (sim-RTSS-run.sh), test (test.sh), bmark (wcet-bmark.sh), syn (wcet-syn.sh), amc (sim-AMC-run.sh)")
+parser.add_argument('-a', '--all', action="store_true", default=False, help="Sweep all devices and latencies (run_all)")
+parser.add_argument('-j', '--jobs', type=int, default=multiprocessing.cpu_count(), help="Number of parallel processes")
+parser.add_argument('-o', '--output', default=None, help="Output file (default results/<tool>.json)")
+parser.add_argument('-t', '--traces', default='./trc-CHStone', help="Directory of the benchmark traces")
+parser.add_argument('-c', '--cores', type=int, nargs='+', default=None, help="Override the core counts of the grid")
+parser.add_argument('-r', '--ranks', type=int, nargs='+', default=None, help="Override the rank counts of the grid")
+parser.add_argument('-e', '--event', action="store_true", default=False, help="Run sim-RTSS in event-driven mode")
+parser.add_argument('-s', '--signature', action="store_true", default=False, help="Run wcet-bmark from the trace signature index (an upper bound on the exact analysis, see wcet-bmark.py)")
+
+
+path = os.path.dirname(os.path.abspath(__file__))
+
+BENCHMARKS = ['adpcm', 'aes', 'bf', 'gsm', 'jpeg', 'mips', 'motion', 'sha', 'dfadd', 'dfdiv', 'dfmul', 'dfsin']
+
+# (device, RL, WL) swept by run_all; the default run only uses DDR3-1333H 9 7
+DEFAULT_DEVICES = [("DDR3-1333H", 9, 7)]
+ALL_DEVICES = [("DDR3-800D", 5, 5), ("DDR3-800D", 6, 5), ("DDR3-800E", 5, 5), ("DDR3-800E", 6, 5),
+		("DDR3-1066E", 6, 6), ("DDR3-1066E", 7, 6), ("DDR3-1066E", 8, 6), ("DDR3-1066F", 7, 6),
+		("DDR3-1066F", 8, 6), ("DDR3-1066G", 8, 6), ("DDR3-1333F", 7, 7), ("DDR3-1333F", 8, 7),
+		("DDR3-1333F", 9, 7), ("DDR3-1333F", 10, 7), ("DDR3-1333G", 8, 7), ("DDR3-1333G", 9, 7),
+		("DDR3-1333G", 10, 7), ("DDR3-1333H", 9, 7), ("DDR3-1333H", 10, 7), ("DDR3-1333J", 10, 7),
+		("DDR3-1600G", 9, 8), ("DDR3-1600G", 10, 8), ("DDR3-1600G", 11, 8), ("DDR3-1600H", 9, 8),
+		("DDR3-1600H", 10, 8), ("DDR3-1600H", 11, 8), ("DDR3-1600J", 10, 8), ("DDR3-1600J", 11, 8),
+		("DDR3-1600K", 11, 8), ("DDR3-1866J", 11, 9), ("DDR3-1866J", 12, 9), ("DDR3-1866J", 13, 9),
+		("DDR3-1866K", 11, 9), ("DDR3-1866K", 12, 9), ("DDR3-1866K", 13, 9), ("DDR3-1866L", 12, 9),
+		("DDR3-1866L", 13, 9), ("DDR3-1866M", 13, 9), ("DDR3-2133K", 11, 10), ("DDR3-2133K", 12, 10),
+		("DDR3-2133K", 13, 10), ("DDR3-2133K", 14, 10), ("DDR3-2133L", 12, 10), ("DDR3-2133L", 13, 10),
+		("DDR3-2133L", 14, 10), ("DDR3-2133M", 13, 10), ("DDR3-2133M", 14, 10), ("DDR3-2133N", 14, 10)]
+
+
+# path of the device timing file
+def device_file(device):
+	return os.path.join(path, 'devices', device + '.txt')
+
+
+# expand the grid of a tool into a list of points; each point is (config dict, script, arguments, trace list)
+def make_grid(args):
+	devices = ALL_DEVICES if args.all else DEFAULT_DEVICES
+	trc = args.traces
+	points = []
+
+	# sim-RTSS.py: lbm interference on all but the last core (sim-RTSS-run.sh)
+	if args.tool == 'rtss' or args.tool == 'test':
+		if args.tool == 'rtss':
+			cores, ranks, benchmarks, bomb = [4, 16], [1, 2, 4], BENCHMARKS, 'diff-lbm'
+		else:
+			cores, ranks, benchmarks, bomb = [8], [1], ['dfsin'], 'diff-membomb'
+		for dev, RL, WL in devices:
+			for core in args.cores or cores:
+				for rank in args.ranks or ranks:
+					# need at least one core (bank) per rank
+					if rank > core:
+						continue
+					for b in benchmarks:
+						config = dict(tool=args.tool, device=dev, RL=RL, WL=WL, cores=core, ranks=rank, bench=b)
+						traces = [os.path.join(trc, bomb)] * (core-1) + [os.path.join(trc, 'diff-' + b)]
+						cmd = [device_file(dev), str(RL), str(WL), '-c', str(core), '-b', str(core/rank), '-r', str(rank)]
+						if args.event:
+							cmd.append('-e')
+						points.append((config, 'sim-RTSS.py', cmd, traces))
+
+	# wcet-bmark.py: one task trace per point (wcet-bmark.sh)
+	elif args.tool == 'bmark':
+		for dev, RL, WL in devices:
+			for core in args.cores or [4, 16]:
+				for rank in args.ranks or [1, 2, 4]:
+					for b in BENCHMARKS:
+						config = dict(tool=args.tool, device=dev, RL=RL, WL=WL, cores=core, ranks=rank, bench=b)
+						cmd = [os.path.join(trc, 'trc-' + b), device_file(dev), str(RL), str(WL), '-c', str(core), '-b', str(core), '-r', str(rank)]
+						if args.signature:
+							cmd.append('-s')
+						points.append((config, 'wcet-bmark.py', cmd, None))
+
+	# wcet-syn.py: synthetic row hit ratios (wcet-syn.sh)
+	elif args.tool == 'syn':
+		for dev, RL, WL in devices:
+			for rank in args.ranks or [2, 4]:
+				for core in args.cores or [4, 16]:
+					for row_hit in [0, 0.25, 0.5, 0.75, 1]:
+						config = dict(tool=args.tool, device=dev, RL=RL, WL=WL, cores=core, ranks=rank, row=row_hit)
+						cmd = [device_file(dev), str(RL), str(WL), '-c', str(core), '-k', str(rank), '-r', str(row_hit)]
+						points.append((config, 'wcet-syn.py', cmd, None))
+
+	# sim-AMC.py: task under analysis against mem-bombs (sim-AMC-run.sh)
+	elif args.tool == 'amc':
+		for core in args.cores or [4, 16]:
+			for b in BENCHMARKS:
+				config = dict(tool=args.tool, cores=core, bench=b)
+				cmd = [str(core), os.path.join(trc, 'diff-' + b)] + [os.path.join(trc, 'diff-membomb')] * (core-1)
+				points.append((config, 'sim-AMC.py', cmd, None))
+
+	return points
+
+
+# run a single point in its own process and return (config, result)
+def run_point(point):
+	config, script, cmd, traces = point
+	list_name = None
+
+	# each point gets a private trace list file instead of the shared traceFiles
+	if traces is not None:
+		fd, list_name = tempfile.mkstemp(prefix='traceFiles-')
+		os.write(fd, '\n'.join(traces) + '\n')
+		os.close(fd)
+		cmd = [list_name] + cmd
+
+	try:
+		proc = subprocess.Popen([sys.executable, os.path.join(path, script)] + cmd,
+					stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+		out, err = proc.communicate()
+	finally:
+		if list_name is not None:
+			os.remove(list_name)
+
+	result = dict(config)
+	if proc.returncode == 0:
+		out = out.strip()
+		try:
+			result['result'] = float(out)
+		except ValueError:
+			result['result'] = out
+	else:
+		result['error'] = err.strip()
+	return result
+
+
+def main():
+	args = parser.parse_args()
+	points = make_grid(args)
+
+	out_name = args.output or os.path.join('results', args.tool + '.json')
+	if os.path.dirname(out_name) and not os.path.isdir(os.path.dirname(out_name)):
+		os.makedirs(os.path.dirname(out_name))
+
+	# write each result as soon as it is done so a long sweep can be inspected while running
+	out_file = open(out_name, 'a')
+	pool = multiprocessing.Pool(processes=max(1, args.jobs))
+	done = 0
+	for result in pool.imap_unordered(run_point, points):
+		out_file.write(json.dumps(result, sort_keys=True) + '\n')
+		out_file.flush()
+		done += 1
+		if 'error' in result:
+			print "failed: " + json.dumps(result, sort_keys=True)
+	pool.close()
+	pool.join()
+	out_file.close()
+
+	print str(done) + " points written to " + out_name
+
+
+
+if __name__ == '__main__': main()
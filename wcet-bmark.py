@@ -3,11 +3,20 @@
 
 	Note: The timing constraints in the input file are in a particular order, no error checking is done."""
 
+import os
 import sys
-import re
+import json
 import random
 import argparse
 from math import *
+import DeviceRegistry
+import TraceCache
+import WCETModels
+
+try:
+	import numpy
+except ImportError:
+	numpy = None	#only needed to map and analyse a whole trace at once (premap)
 
 __metaclass__ = type
 
@@ -25,6 +34,9 @@ parser.add_argument('-b', '--numbank', type=int, default=8, help="Number of Bank
 parser.add_argument('-m', '--mem', type=int, default=0, help="Memory Configuration")
 parser.add_argument('-r', '--rank', type=int, default=1, help="Number of ranks")
 parser.add_argument('-i', '--intlv', type=int, default=2, help="Number of banks interleaved")
+parser.add_argument('-w', '--wcet', nargs='+', choices=['AMC', 'RTSS', 'RTAS', 'THESIS'], default=['THESIS'], help="WCET models evaluated in one trace pass")
+parser.add_argument('-s', '--signature', action="store_true", default=False, help="Evaluate from the trace signature index (needs numpy); an upper bound on the exact analysis (see TraceSignature)")
+parser.add_argument('--max-slack', type=float, default=0.1, help="With -s, walk the trace for the models whose signature bound may be more than this fraction above the exact analysis")
 
 args = parser.parse_args()
 
@@ -39,84 +51,22 @@ num_bank = args.numbank
 num_rank = args.rank
 num_intlv = args.intlv
 mem_config = args.mem
+wcet_models = args.wcet
+use_signature = args.signature
 
+if use_signature and numpy is None:
+	parser.error("--signature needs numpy")
 
 
-# Memory Device contains all timing constraints
-class MemDevice:
-
-	def __init__(self, newFile, RL, WL):
-		self.File = newFile
-		self.tRL = RL
-		self.tWL = WL
-		self.__get_timing()
-
-	def __get_timing(self):
-		input_line = [0]
-		in_file = self.File
-		time_param = []
-
-		# Loop until EOF has been reached
-		while True:
-
-			# Read the next input line from the input trace
-			input_line[0] = in_file.readline()
 
-			# EOF reached?
-			if input_line[0] == "" or input_line[0] =='\n':
-				break
-
-			# Get the time constraints and added to list
-			constraint = float(re.split(' ', input_line[0])[2])
-			time_param.append(constraint)
-
-		# Make sure all timing constraints are in the input file
-		if time_param.__len__() != 12:
-			print "Missing timing constraints in input device file"
-			exit(0)
-
-		# Name all the timing constraints to make the formula easier to read
-		# This is also the order in which the input file should be
-		self.tRCD = time_param[0]
-		self.tRP = time_param[1]
-		self.tRC = time_param[2]
-		self.tRAS = time_param[3]
-		self.tRTP = time_param[4]
-		self.tWR = time_param[5]
-		self.tWTR = time_param[6]
-		self.tRRD1 = time_param[7]
-		self.tRRD2 = time_param[8]
-		self.tFAW1 = time_param[9]
-		self.tFAW2 = time_param[10]
-		self.tCK = time_param[11]
-		self.tFAW = self.tFAW1
-		self.tRRD = self.tRRD1
-		self.tRTW = (6 + (self.tRL - self.tWL)) * self.tCK
-		self.tRL *= self.tCK
-		self.tWL *= self.tCK
-		self.tBUS = 4 * self.tCK
-		self.tCCD = 4 * self.tCK
-		self.tREF = 7800
-		self.tRFC = 160
-		self.tRTR = 2 * self.tCK
-
-
-
-
-# WCET for AMC Model
+# Cost of a request under AMC: the latency of a read or a write (terms from WCETModels.py)
 class AMC:
 
 	def __init__(self, device, cores):
 		self.device = device
-		self.cores = cores
-		self.__calc_parts()
-
-	def __calc_parts(self):
-		mem = self.device
-		L_R = mem.tRCD + mem.tRL + mem.tBUS*num_intlv
-		L_W = mem.tRCD + mem.tWL + mem.tBUS*num_intlv
-		self.t_R = L_R + (self.cores-1)*mem.tRC
-		self.t_W = L_W + (self.cores-1)*mem.tRC
+		terms = WCETModels.amc_terms(device, cores, num_intlv)
+		self.t_R = terms['t_R']
+		self.t_W = terms['t_W']
 
 	""" this function dont need prev, but it's there so mem-controller can call any WCET model without changing parameter """
 	def get_time(self, curr, prev):
@@ -125,43 +75,22 @@ class AMC:
 		else:
 			return self.t_W
 
-# WCET for RTSS-2013 (Zheng's Paper) Model
-class RTSS:
+	# get_time for whole arrays of requests (numpy bool arrays of write and hit flags)
+	def get_times(self, write, hit, prevWrite, prevHit):
+		return numpy.where(write, self.t_W, self.t_R)
 
-	def __init__(self, device, cores):
-		self.device = device
-		self.cores = cores
-		self.__calc_parts()
-
-	def __calc_parts(self):
-		mem = self.device
-		num_cores = self.cores
-
-		# tDP
-		tDP_c_rd = max( (mem.tRTP-(mem.tRL+mem.tBUS)), (mem.tRAS - (mem.tRL+mem.tBUS+mem.tRCD)), 0)
-		tDP_o_rd = max( (mem.tRTP-(mem.tRL+mem.tBUS)), 0 )
-		tDP_wr = max( (mem.tWR), (mem.tRAS - (mem.tWL+mem.tBUS+mem.tRCD)) )
-
-		# tIP
-		tIP = (num_cores-1)*mem.tCK
-
-		# tDA
-		tDA_c_rd = max( (tDP_c_rd + tIP + mem.tRP), (mem.tRC - (mem.tRL+mem.tBUS+mem.tRCD)) )
-		tDA_o_rd = (tDP_o_rd + tIP + mem.tRP)
-		tDA_wr = (tDP_wr + tIP + mem.tRP)
-
-		# tIA
-		tIA = (mem.tFAW - 4*mem.tRRD) + floor(float(num_cores-1)/4)*mem.tFAW + ((num_cores-1)%4)*mem.tRRD
-
-		# tAC
-		self.tAC_wr = tDA_wr + tIA + mem.tRCD
-		self.tAC_c_rd = tDA_c_rd + tIA + mem.tRCD
-		self.tAC_o_rd = tDA_o_rd + tIA + mem.tRCD
-
-		# tCD
-		self.tCD_wr = floor(float(num_cores/2))*(mem.tWTR + mem.tRTW) + ceil(float(num_cores/2))*(mem.tWL + mem.tBUS)
-		self.tCD_rd = (mem.tWTR+mem.tRL+mem.tBUS) + floor(float(num_cores-1)/2)*(mem.tWTR+mem.tRTW) + ceil(float(num_cores-1)/2)*(mem.tWL+mem.tBUS)
+# Cost of a request under the RTSS based models (RTSS, RTAS, THESIS): the tAC and tCD terms of the
+# model (from WCETModels.py) picked by the case of the request and the one before it
+class CaseModel:
 
+	def __init__(self, model, device, cores, rank):
+		self.device = device
+		terms = WCETModels.model_terms(model, device, cores, rank, num_intlv)
+		self.tAC_wr = terms['tAC_wr']
+		self.tAC_c_rd = terms['tAC_c_rd']
+		self.tAC_o_rd = terms['tAC_o_rd']
+		self.tCD_wr = terms['tCD_wr']
+		self.tCD_rd = terms['tCD_rd']
 
 	# This method return the appopriate cases depending on curr and prev requests
 	def get_time(self, curr, prev):
@@ -191,171 +120,15 @@ class RTSS:
 
 		return time
 
+	# get_time for whole arrays of requests (numpy bool arrays of write and hit flags), same cases
+	def get_times(self, write, hit, prevWrite, prevHit):
+		miss = ~hit
+		time = numpy.where(miss & prevWrite, self.tAC_wr,			# Case 1
+			numpy.where(miss, numpy.where(prevHit, self.tAC_o_rd, self.tAC_c_rd),	# Case 2 and 3
+			numpy.where(prevWrite & ~write, self.device.tWTR, 0)))		# Case 4
 
-
-# WCET for THESIS (multi-rank version of RTSS)
-class THESIS(RTSS):
-
-	def __init__(self, device, cores, rank):
-		self.device = device
-		self.rank = rank
-		self.cores = cores/self.rank  # M_r in paper, not total cores
-		self.total_core = cores # Sum of all M_r, so M in theis
-		self.__calc_tAC()
-		self.__calc_tCD()
-
-	def __calc_tAC(self):
-		mem = self.device
-		num_cores = self.cores
-
-		# tDP
-		tDP_c_rd = max( (mem.tRTP-(mem.tRL+mem.tBUS)), (mem.tRAS - (mem.tRL+mem.tBUS+mem.tRCD)), 0)
-		tDP_o_rd = max( (mem.tRTP-(mem.tRL+mem.tBUS)), 0 )
-		tDP_wr = max( (mem.tWR), (mem.tRAS - (mem.tWL+mem.tBUS+mem.tRCD)) )
-
-		# tIP
-		tIP = (self.total_core-1)*mem.tCK
-
-		# tDA
-		tDA_c_rd = max( (tDP_c_rd + tIP + mem.tRP), (mem.tRC - (mem.tRL+mem.tBUS+mem.tRCD)) )
-		tDA_o_rd = (tDP_o_rd + tIP + mem.tRP)
-		tDA_wr = (tDP_wr + tIP + mem.tRP)
-
-		# tIA
-		tIA = (mem.tFAW - 4*mem.tRRD) + floor(float(num_cores-1)/4)*mem.tFAW + ((num_cores-1)%4)*mem.tRRD + (self.total_core-self.cores)*mem.tCK
-
-		# tAC
-		self.tAC_wr = tDA_wr + tIA + mem.tRCD
-		self.tAC_c_rd = tDA_c_rd + tIA + mem.tRCD
-		self.tAC_o_rd = tDA_o_rd + tIA + mem.tRCD
-
-	def __calc_tCD(self):
-		mem = self.device
-		num_cores = self.cores
-
-		F_R = mem.tWTR + mem.tRL + mem.tBUS
-		F_W = mem.tWL + mem.tBUS
-
-		D_WR = F_R
-		D_RW = mem.tRTW + mem.tWL - mem.tRL
-		D_RNK = mem.tRTR + mem.tBUS
-
-		N_WR_other = floor(float(self.cores)/2)  # this is # of W-R for other ranks
-		N_WR_rd = N_WR_other  # this is # of W-R for my rank if CAS under analysis is read
-		N_WR_wr = floor(float(self.cores-1)/2) # this is # of W-R for my rank if CAS under analysis is write
-
-		# M_r is same for all ranks since we're diving them evenly amongest ranks
-		other = 1
-		if self.cores % 2 == 0: # i.e. M_r is even
-			other = 0
-
-		# My is more complicated; for Read: WR|WR or R|WR|WR; for W: R|WR|W or WR|WR|W
-		my_rd = 0
-		my_wr = 0
-		if self.cores % 2 == 0: # even case of write in above comment
-			my_wr = 1
-		else:		# odd case of read in above comment
-			my_rd = 1
-
-
-		# if other = 1 start with read; else just start with write instead
-		flag = 0
-		first_rd = F_W
-		first_wr = F_W
-		if other == 1:
-			first_rd = F_R
-			first_wr = F_R
-			flag = 1
-
-
-		# upper bound on x for read and write (CAS under analysis)
-		x_rd = self.rank * N_WR_rd
-		x_wr = (self.rank -1) * N_WR_rd + N_WR_wr
-
-
-		# lower bound on z; 
-		z_rd = self.rank - 1 # R - 1
-		z_wr = self.rank - 1
-
-
-		# if other can not give extra read, then check my
-		if flag == 0:
-			if my_wr == 1:
-				first_wr = F_R
-				z_wr = self.rank 	# bound on z increase by one
-			if my_rd == 1:
-				first_rd = F_R
-				z_rd = self.rank 	# bound on z increase by one
-
-
-		# bound on z can increase more if it's greater than D_RW
-		if D_RNK >= D_RW:
-			# M-1-x; allocate remaining transtion to z
-			z_rd = (self.total_core - 1) - x_rd  	
-			z_wr = (self.total_core - 1) - x_wr
-
-		# bound on y; can be zero
-		y_rd = self.total_core - 1 - x_rd - z_rd
-		y_wr = self.total_core - 1 - x_wr - z_wr		
-
-
-		self.tCD_wr = first_wr + x_wr*D_WR + y_wr*D_RW + z_wr*D_RNK
-		self.tCD_rd = first_rd + x_rd*D_WR + y_rd*D_RW + z_rd*D_RNK
-
-
-# WCET for RTAS-2013 (Yogen's Paper) Model
-class RTAS(RTSS):
-
-	def __init__(self, device, cores, rank):
-		self.device = device
-		self.rank = rank
-		self.cores = cores/self.rank  # M_r in paper, not total cores
-		self.__calc_parts()
-
-	def __calc_parts(self):
-		mem = self.device
-		num_cores = self.cores
-
-	 # tAC Parts:
-		# tDP
-		tDP_c_rd = max( (mem.tRTP-(mem.tRL+mem.tBUS)), (mem.tRAS - (mem.tRL+mem.tBUS+mem.tRCD)), 0)
-		tDP_o_rd = max( (mem.tRTP-(mem.tRL+mem.tBUS)), 0 )
-		tDP_wr = max( (mem.tWR), (mem.tRAS - (mem.tWL+mem.tBUS+mem.tRCD)) )
-
-		# tIP
-		tIP = ( ceil(float(self.rank*self.cores)/float((mem.tBUS/mem.tCK)-1)) + (self.rank*self.cores) - 1 )*mem.tCK
-
-		# tDA
-		tDA_c_rd = max( (tDP_c_rd + tIP + mem.tRP), (mem.tRC - (mem.tRL+mem.tBUS+mem.tRCD)) )
-		tDA_o_rd = (tDP_o_rd + tIP + mem.tRP)
-		tDA_wr = (tDP_wr + tIP + mem.tRP)
-
-		# tIA
-		self.delta_IA = (ceil(float(self.rank)/float((mem.tBUS/mem.tCK)-1)) + self.rank - 1)*mem.tCK
-		tIA = (mem.tFAW - 4*mem.tRRD) + (self.cores-1)*mem.tRRD + self.cores*self.delta_IA
-
-		# tAC
-		self.tAC_wr = tDA_wr + tIA + mem.tRCD
-		self.tAC_c_rd = tDA_c_rd + tIA + mem.tRCD
-		self.tAC_o_rd = tDA_o_rd + tIA + mem.tRCD
-
-	 # tCD Parts:
-		# tRWD and tWRD
-		tRWD = max(self.rank*(mem.tBUS+mem.tRTR), (mem.tRTW+mem.tWL-mem.tRL+mem.tBUS+mem.tRTR-1) )
-		tWRD = max( self.rank*(mem.tBUS+mem.tRTR), (mem.tWTR+mem.tRL+2*mem.tBUS+mem.tRTR-1) )
-
-		# tWD and tRD
-		tWD = mem.tRL + mem.tBUS - 1 + (self.rank)*(mem.tBUS + mem.tRTR)
-		tRD = max( (mem.tRL+mem.tBUS-1+(self.rank)*(mem.tBUS+mem.tRTR)), (mem.tWTR+mem.tRL+2*mem.tBUS+mem.tRTR-1) )
-
-		# tCD
-		#if tRWD == tWRD:
-		#	self.tCD_wr = tRD + (self.cores-1)*tRWD
-		#	self.tCD_rd = self.tCD_wr
-		#else:
-		self.tCD_wr = ceil(float(self.cores-1)/2.0)*tRWD + floor(float(self.cores-1)/2.0)*tWRD + (self.cores%2)*tWD + (1-self.cores%2)*tRD
-		
-		self.tCD_rd = floor(float(self.cores-1)/2.0)*tRWD + ceil(float(self.cores-1)/2.0)*tWRD + (self.cores%2)*tRD + (1-self.cores%2)*tWD
+		# tCD Part
+		return time + numpy.where(write, self.tCD_wr*num_intlv, self.tCD_rd*num_intlv)
 
 
 
@@ -370,36 +143,38 @@ class Request:
 		self.rank = 0
 		self.bank = 0
 		self.row = 0
+		self.mapped = False	#rank/bank/row already set from a premapped trace
 
 # MemConfig: input Request, return Request w/ updated params
 class MemConfig:
 
+	# (mask, shift) of rank, bank and row for each configuration
+	MAP = {
+		# SSBB BRRR RRRR RRRR RRRC CCCC CCCC COOO
+		0: ((0xc0000000, 30), (0x38000000, 27), (0x07ffe000, 13)),
+		# SSRR RRRR RRRR RRRR BBBC CCCC CCCC COOO
+		1: ((0xc0000000, 30), (0x0000e000, 13), (0x3fff0000, 16)),
+	}
+
 	def __init__(self, config):
 		self.config = config
+		(self.rank_mask, self.rank_shift), (self.bank_mask, self.bank_shift), (self.row_mask, self.row_shift) = self.MAP[config]
 
 	def get_target(self, request):
-		if self.config == 0:
-			""" SSBB BRRR RRRR RRRR RRRC CCCC CCCC COOO """
-			rank_mask = 0xc0000000; rank_shift = 30
-			bank_mask = 0x38000000; bank_shift = 27
-			row_mask = 0x07ffe000; row_shift = 13
-
-		elif self.config == 1:
-			""" SSRR RRRR RRRR RRRR BBBC CCCC CCCC COOO """
-			rank_mask = 0xc0000000; rank_shift = 30
-			bank_mask = 0x0000e000; bank_shift = 13
-			row_mask = 0x3fff0000; row_shift = 16
-
-		rank = (request.addr & rank_mask) >> rank_shift
-		bank = (request.addr & bank_mask) >> bank_shift
-		row = (request.addr & row_mask) >> row_shift
-
-		request.rank = rank
-		request.bank = bank
-		request.row = row
+		request.rank = (request.addr & self.rank_mask) >> self.rank_shift
+		request.bank = (request.addr & self.bank_mask) >> self.bank_shift
+		request.row = (request.addr & self.row_mask) >> self.row_shift
 
 		return request
 
+	# map a whole trace at once; addr is a numpy array, returns rank, bank and row arrays
+	def map_trace(self, addr):
+		addr = numpy.asarray(addr, dtype=numpy.uint64)
+		result = []
+		for mask, shift in self.MAP[self.config]:
+			result.append(((addr & numpy.uint64(mask)) >> numpy.uint64(shift)).astype(numpy.int64))
+		return tuple(result)
+
 # Object to keep track of bank states
 class MemBank:
 
@@ -421,50 +196,329 @@ class MemBank:
 		idx = (req.rank + 1) * req.bank
 		self.bank_state[idx] = req.row
 
+	""" is_hit and set_row for a whole trace (numpy arrays of rank, bank and row), returns the hit flags.
+		A bank always ends up with the row of its last request, so a request hits if its row is the row of
+		the previous request to the same bank (or the row the bank was left with). """
+	def get_hits(self, rank, bank, row):
+		idx = (rank + 1) * bank
+		if len(idx) and idx.max() >= len(self.bank_state):
+			raise IndexError("list index out of range")
+
+		# group the requests by bank, keeping them in trace order inside a bank
+		order = numpy.argsort(idx, kind='mergesort')
+		s_idx = idx[order]
+		s_row = row[order]
+		first = numpy.ones(len(idx), dtype=bool)
+		first[1:] = s_idx[1:] != s_idx[:-1]
+		last = numpy.ones(len(idx), dtype=bool)
+		last[:-1] = first[1:]
+
+		state = numpy.array(self.bank_state, dtype=s_row.dtype)
+		prev_row = numpy.empty_like(s_row)
+		prev_row[1:] = s_row[:-1]
+		prev_row[first] = state[s_idx[first]]
+
+		hit = numpy.empty(len(idx), dtype=bool)
+		hit[order] = (s_row == prev_row)
+
+		# leave the banks as the per request walk would
+		state[s_idx[last]] = s_row[last]
+		self.bank_state[:] = state.tolist()
+		access = numpy.bincount(idx, minlength=len(self.bank_access))
+		self.bank_access[:] = (numpy.array(self.bank_access) + access).tolist()
+		return hit
+
 
 # Trace File Object that reads input file and output Requests
 class Trace:
 
 	def __init__(self, trcFile):
-		self.trcFile = trcFile
+		self.trace = TraceCache.load(trcFile.name)	#parsed from the binary cache
+		self.pos = 0
+		self.target = None	#rank, bank and row lists when the trace is premapped
+		self.target_array = None	#same as numpy arrays
+
+	# map the whole trace up front so get_WCET can skip mapping each request
+	def premap(self, memConfig):
+		self.target_array = memConfig.map_trace(self.trace.addr_array())
+		self.target = tuple(a.tolist() for a in self.target_array)
+
+	# time, write flag, rank, bank and row arrays of the rest of the trace; the trace goes back to the beginning
+	def get_arrays(self):
+		i = self.pos
+		self.pos = 0
+		write = self.trace.type_array()[i:] == TraceCache.req_type("WRITE")
+		return (self.trace.delta_array()[i:], write) + tuple(a[i:] for a in self.target_array)
 
 	def get_next(self):
-		# read the next input line from trace file
-		input_line = [0]
-		input_line[0] = self.trcFile.readline()
-
 		# If end of file reached, go to beginning and return None (null)
-		if input_line[0] == "" or input_line[0] =='\n':
-			self.trcFile.seek(0,0)
+		if self.pos == len(self.trace):
+			self.pos = 0
 			return None
-		
-		addr = int(re.split('\W+', input_line[0])[0], base=16)
-		memType = str(re.split('\W+', input_line[0])[1])
-		time = int(re.split('\W+', input_line[0])[2])
 
-		return Request(addr, time, memType)
+		i = self.pos
+		self.pos += 1
+		req = Request(self.trace.addr(i), self.trace.delta(i), self.trace.type_name(i))
+		if self.target is not None:
+			req.rank = self.target[0][i]
+			req.bank = self.target[1][i]
+			req.row = self.target[2][i]
+			req.mapped = True
+		return req
+
+
+""" Transition signature of a trace: the number of requests for each (prev write, prev hit, curr write,
+	curr hit) plus the time of the last request. The cost of a request only depends on these four flags,
+	so without refresh the clock of any device, RL/WL or core count is the last time plus the sum of
+	count x cost over the 16 cells. Row hits depend on the mapping and on the banks, so a signature is
+	kept per (memory configuration, ranks, banks) in one index file next to the trace.
+
+	Refresh correction: the first request to reach the controller in a new refresh window is cut, i.e.
+	can't hit. Cutting a miss changes nothing; cutting a hit raises its cost (its prev may be cut as
+	well) and the cost of the next request, whose prev is no longer a hit. A refresh on a hit of a cell
+	therefore adds at most the largest increase of that cell plus the largest increase of a cell that
+	can follow it, and K refreshes add at most the sum of the K largest of these over the hits of the
+	trace (a cell's increase counted as many times as the cell occurs). A refresh cuts at most one
+	request and the K-th one arrives at K*tREF or later, so K is at most the largest K <= requests with
+	K*tREF <= C0 + extra(K), with C0 the clock without refresh and extra(K) that sum. C0 + extra(K) is
+	never below the per request walk, apart from the rounding of its long float sum.
+
+	It is an upper bound, not the exact analysis, and it gets looser with more refreshes and larger
+	cut costs, i.e. with more cores. The exact clock is never below C0, so get_WCET returns None when
+	the bound is more than max_slack above C0 and the caller walks the trace instead: whatever -s prints
+	is at most --max-slack above the exact analysis. Against the walk on 8k to 200k request traces
+	(DDR3-800D to 2133N, 4 ranks) the bound was at most 1% above at 4 cores, 2% at 16 and 5% at 64;
+	C0 is further below, so at 64 cores a max_slack under 10% mostly ends in the walk. """
+class TraceSignature:
+
+	EXT = '.sig.cache'
+
+	def __init__(self, counts, time, requests):
+		self.counts = counts	#16 counts, cell = prev write*8 + prev hit*4 + curr write*2 + curr hit
+		self.time = time	#time of the last request, i.e. the total of the time_diff
+		self.requests = requests
+
+	# the flags of the 16 cells as numpy arrays (write, hit, prevWrite, prevHit)
+	@staticmethod
+	def cells():
+		cell = numpy.arange(16)
+		return (cell & 2) > 0, (cell & 1) > 0, (cell & 8) > 0, (cell & 4) > 0
+
+	# count the transitions of a premapped trace
+	@classmethod
+	def build(cls, trace, memBank):
+		time, write, rank, bank, row = trace.get_arrays()
+		if not len(time):
+			return cls([0] * 16, 0, 0)
+
+		memBank.reset()
+		hit = memBank.get_hits(rank, bank, row)
+
+		# the request before the first one is the worst case write
+		prev_write = numpy.concatenate(([True], write[:-1]))
+		prev_hit = numpy.concatenate(([False], hit[:-1]))
+		cell = prev_write*8 + prev_hit*4 + write*2 + hit
+		return cls(numpy.bincount(cell, minlength=16).tolist(), int(time[-1]), len(time))
+
+	# signature of the trace for a mapping and bank layout, from the index file or built and added to it
+	@classmethod
+	def load(cls, trace, memBank, memConfig, numRank, numBank):
+		path = trace.trace.name
+		index_path = path + cls.EXT
+		stat = os.stat(path)
+		key = "%d %d %d" % (memConfig.config, numRank, numBank)
+
+		index = {}
+		if os.path.exists(index_path):
+			index_file = open(index_path, 'r')
+			index = json.load(index_file)
+			index_file.close()
+			# the trace changed, start a new index
+			if index.get('mtime') != stat.st_mtime or index.get('size') != stat.st_size:
+				index = {}
+
+		if key in index.get('signature', {}):
+			sig = index['signature'][key]
+			return cls(sig['counts'], sig['time'], sig['requests'])
+
+		if trace.target_array is None:
+			trace.premap(memConfig)
+		sig = cls.build(trace, memBank)
+
+		index.update(mtime=stat.st_mtime, size=stat.st_size)
+		index.setdefault('signature', {})[key] = dict(counts=sig.counts, time=sig.time, requests=sig.requests)
+		try:
+			tmp_path = index_path + '.%d' % os.getpid()
+			index_file = open(tmp_path, 'w')
+			json.dump(index, index_file, sort_keys=True)
+			index_file.close()
+			os.rename(tmp_path, index_path)	#atomic so parallel runs never see a partial index
+		except (IOError, OSError):
+			pass
+
+		return sig
+
+	# WCET bound of the trace for a model (see the refresh correction above), None if it may be more
+	# than max_slack (a fraction) above the exact analysis
+	def get_WCET(self, model, device, max_slack):
+		write, hit, prev_write, prev_hit = self.cells()
+		miss = numpy.zeros(16, dtype=bool)
+		cost = model.get_times(write, hit, prev_write, prev_hit)
+		counts = numpy.array(self.counts)
+		clock = self.time + float(numpy.dot(counts, cost))
+
+		# increase of a cut request (with its prev cut or not) and of a request whose prev hit was cut
+		own = numpy.maximum(model.get_times(write, miss, prev_write, prev_hit), model.get_times(write, miss, prev_write, miss)) - cost
+		after = model.get_times(write, hit, prev_write, miss) - cost
+
+		# a cut hit is followed by a cell with a prev hit of the same type, if the trace has one
+		seen = counts > 0
+		follow = [max([0.0] + after[seen & prev_hit & (prev_write == w)].tolist()) for w in (False, True)]
+		delta = numpy.maximum(own, 0) + numpy.where(write, follow[1], follow[0])
+
+		# the refreshes are charged to the costliest hits; extra[k] is the increase of k refreshes
+		cut = seen & hit
+		order = numpy.argsort(-delta[cut], kind='mergesort')
+		per_ref = numpy.repeat(delta[cut][order], counts[cut][order])
+		extra = numpy.concatenate(([0.0], numpy.cumsum(per_ref)))
+
+		# largest number of refreshes the bounded clock can reach
+		k = numpy.arange(self.requests + 1)
+		reached = k * device.tREF <= clock + extra[numpy.minimum(k, len(per_ref))]
+		num_ref = int(numpy.flatnonzero(reached)[-1])
+		bound = clock + float(extra[min(num_ref, len(per_ref))])
 
-
-# Mem controller model to get total run time for benchmark given the WCET model
+		# Add refresh delay and return
+		lowest = clock + (device.tRFC)*(ceil(float(clock)/device.tREF))
+		bound += (device.tRFC)*(ceil(float(bound)/device.tREF))
+		if bound > lowest * (1 + max_slack):
+			return None
+		return bound
+
+
+# index of the first value >= x in a[i:], or len(a); peak is the running maximum of a
+def first_at_least(a, peak, i, x):
+	# arrival times are sorted unless the trace times go back, then scan in growing windows from i
+	j = peak.searchsorted(x)
+	if j >= i:
+		return j
+
+	size = 64
+	while i < len(a):
+		found = numpy.flatnonzero(a[i:i+size] >= x)
+		if found.size:
+			return i + found[0]
+		i += size
+		size *= 2
+	return len(a)
+
+""" Clock at the end of the trace. time_diff is the gap before each request and cost[ref][prev ref]
+	the cost of each request depending on whether it (or the request before it) reached the controller
+	in a new refresh window. Refresh windows are found by jumping from one to the next on the arrival
+	times without refresh, adjusted by the cost changed so far. The exact arrival times (summed in the
+	same order as the per request walk) are then checked against them; the first wrong flag is fixed
+	and the rest of the trace is guessed again from there. """
+def refresh_clock(time_diff, cost, tREF):
+	n = len(time_diff)
+	ref = numpy.zeros(n, dtype=bool)
+	steps = numpy.empty(2*n)
+	steps[0::2] = time_diff
+
+	# cost change of a request cut by refresh, after a request cut by refresh, or both
+	cut = (cost[1][0] - cost[0][0], cost[0][1] - cost[0][0], cost[1][1] - cost[0][0])
+
+	# arrival clock of every request and clock at the end, for the given refresh flags
+	def walk(ref):
+		prev_ref = numpy.concatenate(([False], ref[:-1]))
+		curr_cost = numpy.where(ref, numpy.where(prev_ref, cost[1][1], cost[1][0]), numpy.where(prev_ref, cost[0][1], cost[0][0]))
+		steps[1::2] = curr_cost
+		total = numpy.cumsum(steps)
+		return total[0::2], float(total[-1])
+
+	start = 0
+	while True:
+		arrival, end = walk(ref)
+
+		# refresh_reached with the number of refreshes before each request
+		num_ref = numpy.cumsum(ref) - ref
+		reached = numpy.floor(arrival/tREF) > num_ref
+		wrong = numpy.flatnonzero(reached[start:] != ref[start:])
+		if not wrong.size:
+			return end
+
+		# everything before the first wrong flag is exact, so is the flag itself now
+		f = start + wrong[0]
+		ref[f] = reached[f]
+		ref[f+1:] = False
+		start = f + 1
+		nref = int(num_ref[f] + ref[f])
+
+		arrival, end = walk(ref)
+		peak = numpy.maximum.accumulate(arrival)
+		off = 0.0
+		i = start
+
+		# guess the rest of the flags; this loop runs once per refresh window
+		while i < n:
+			j = first_at_least(arrival, peak, i, (nref+1)*tREF - off)
+			if j == n:
+				break
+			if not floor((arrival[j] + off)/tREF) > nref:
+				i = j + 1
+				continue
+
+			# one refresh or more in a row, then a request with a missed prev
+			# (the request after f was walked with its prev already cut)
+			off += cut[2][j] - cut[1][j] if j == start and ref[f] else cut[0][j]
+			while True:
+				ref[j] = True
+				nref += 1
+				j += 1
+				if j == n or not floor((arrival[j] + off)/tREF) > nref:
+					break
+				off += cut[2][j]
+			if j < n:
+				off += cut[1][j]
+				j += 1
+			i = j
+
+
+# Mem controller model to get total run time for benchmark given the WCET model(s)
 class MemController:
 
-	# mem controller contains all the sub-components
+	# mem controller contains all the sub-components; WCET is one model or a list of models
 	def __init__(self, trace, device, memBank, memConfig, WCET):
 		self.trace = trace
 		self.device = device
 		self.bank = memBank
 		self.map = memConfig
 		self.model = WCET
+		self.models = list(WCET) if isinstance(WCET, (list, tuple)) else [WCET]
 
 	def refresh_reached(self, clock, numREF):
 		return (floor(float(clock)/self.device.tREF) > numREF)
 
+	""" Returns the clock of the model, or a list of clocks in the same order when the controller was
+		given a list of models. A premapped trace is analysed as numpy arrays, otherwise request by request. """
 	def get_WCET(self):
+		if self.trace.target_array is not None:
+			clock = self.__get_WCET_array()
+		else:
+			clock = self.__get_WCET_trace()
+
+		return clock if isinstance(self.model, (list, tuple)) else clock[0]
+
+	""" Walk the trace once for all the models: mapping and row hit detection are shared, only the
+		clock (and so the refresh count) differs per model. """
+	def __get_WCET_trace(self):
 		# variables
-		clock = 0
+		models = self.models
+		lanes = range(len(models))
+		clock = [0] * len(models)
+		num_ref = [0] * len(models)
+		num_hits = [0] * len(models)
+		prev_hit = [0] * len(models)
 		exec_time = 0
-		num_ref = 0
-		num_hits = 0
 		num_access = 0
 
 		# get the first request and prev_req is worst case and reset bank state
@@ -475,7 +529,8 @@ class MemController:
 	# Main Simulation Loop	
 		while curr_req is not None:
 		# Step1: map incoming request to get rank, bank, and row
-			self.map.get_target(curr_req)
+			if not curr_req.mapped:
+				self.map.get_target(curr_req)
 			num_access += 1
 
 		# Step 2:
@@ -483,25 +538,30 @@ class MemController:
 			time_diff = curr_req.time - prev_req.time
 			exec_time += time_diff
 
-			# advance clock time to when the request reaches controller
-			clock += time_diff
-
 		# Step 3:
-			# check if the request is a hit and refresh is not reached
-			if self.bank.is_hit(curr_req) and not self.refresh_reached(clock, num_ref):
-					curr_req.hit = 1
-					num_hits += 1
-			# otherwise it's a miss and update bank state with new row
-			else:
+			# check if the row is open; a miss updates bank state with new row
+			# (a hit cut by refresh writes back the same row, so the bank state is the same for all models)
+			row_hit = self.bank.is_hit(curr_req)
+			if not row_hit:
 				self.bank.set_row(curr_req)
 
-			# update number of refresh if REF period is reached
-			if self.refresh_reached(clock, num_ref):
-				num_ref += 1
+			for m in lanes:
+				# advance clock time to when the request reaches controller
+				clk = clock[m] + time_diff
 
+				# the request is a hit only if refresh is not reached; update number of refresh if it is
+				hit = 0
+				if self.refresh_reached(clk, num_ref[m]):
+					num_ref[m] += 1
+				elif row_hit:
+					hit = 1
+					num_hits[m] += 1
 
 		# Step 4: advance clock by servicing the request
-			clock += self.model.get_time(curr_req, prev_req)
+				curr_req.hit = hit
+				prev_req.hit = prev_hit[m]
+				clock[m] = clk + models[m].get_time(curr_req, prev_req)
+				prev_hit[m] = hit
 
 		
 		# Step 5: get the next request
@@ -510,11 +570,41 @@ class MemController:
 	# End Of Simulation Loop
 		
 		# Add refresh delay and return
-		clock += (self.device.tRFC)*(ceil(float(clock)/self.device.tREF))
+		for m in lanes:
+			clock[m] += (self.device.tRFC)*(ceil(float(clock[m])/self.device.tREF))
 		# TODO: create statistics object and return that instead
 
 		return clock
 
+	""" Same analysis on the whole trace as arrays. Row hits only depend on the trace, and the cost of
+		every request is a table lookup on (write, hit, prev write, prev hit). Only refresh is sequential:
+		a request that reaches the controller in a new refresh window can't hit, which changes its cost
+		(and the cost of the next request) and so the arrival time of everything after it. """
+	def __get_WCET_array(self):
+		time, write, rank, bank, row = self.trace.get_arrays()
+		n = len(time)
+		if n == 0:
+			return [0] * len(self.models)
+
+		self.bank.reset()
+		row_hit = self.bank.get_hits(rank, bank, row)
+
+		# the request before the first one is the worst case write
+		prev_write = numpy.concatenate(([True], write[:-1]))
+		prev_hit = numpy.concatenate(([False], row_hit[:-1]))
+		miss = numpy.zeros(n, dtype=bool)
+		time_diff = numpy.diff(numpy.concatenate(([0], time)))
+
+		clock = []
+		for model in self.models:
+			# cost[ref][prev ref]: the request (or the one before) is cut by refresh
+			cost = ((model.get_times(write, row_hit, prev_write, prev_hit), model.get_times(write, row_hit, prev_write, miss)),
+				(model.get_times(write, miss, prev_write, prev_hit), model.get_times(write, miss, prev_write, miss)))
+			end = refresh_clock(time_diff, cost, self.device.tREF)
+			clock.append(end + (self.device.tRFC)*(ceil(end/self.device.tREF)))
+
+		return clock
+
 
 
 def main():
@@ -524,28 +614,42 @@ def main():
 	trc = Trace(trc_file)
 
 	# create a memory device and extract constraints from input file
-	mem = MemDevice(time_file, RL, WL)
+	mem = DeviceRegistry.get_device(time_file.name, RL, WL)
 
 	# Initialize memory banks and mapping
 	mem_bank = MemBank(num_rank, num_bank) 
 	mem_map = MemConfig(mem_config)
 
-
-	# create WCET model
-	barc = AMC(mem, num_cores)
-	zheng = RTSS(mem, num_cores)
-	yogen = RTAS(mem, num_cores, num_rank)
-	master = THESIS(mem, num_cores, num_rank)
+	# numpy is optional; without it each request is mapped while walking the trace
+	if numpy is not None and not use_signature:
+		trc.premap(mem_map)
 
 
-	# create mem controller for WCET model
-	sim_AMC = MemController(trc, mem, mem_bank, mem_map, barc)
-	sim_RTSS = MemController(trc, mem, mem_bank, mem_map, zheng)
-	sim_RTAS = MemController(trc, mem, mem_bank, mem_map, yogen)
-	sim_thesis = MemController(trc, mem, mem_bank, mem_map, master)
-
-	print sim_thesis.get_WCET()
-	#print "{0:.2f}		{1:.2f}		{2:.2f}".format(sim_AMC.get_WCET(), sim_RTSS.get_WCET(), sim_RTAS.get_WCET())
+	# create WCET model
+	wcet = [AMC(mem, num_cores) if name == 'AMC' else CaseModel(name, mem, num_cores, num_rank) for name in wcet_models]
+
+
+	# the signature is built once per trace and mapping, then any device and core count is a table lookup
+	clock = None
+	if use_signature:
+		sig = TraceSignature.load(trc, mem_bank, mem_map, num_rank, num_bank)
+		clock = [sig.get_WCET(model, mem, args.max_slack) for model in wcet]
+
+		# the bound of a model is too loose (mostly many cores), fall back to the exact analysis
+		if None in clock:
+			print >> sys.stderr, "signature bound too loose for " + ", ".join(name for name, c in zip(wcet_models, clock) if c is None) + ", walking the trace"
+			trc.premap(mem_map)
+			clock = None
+
+	# create mem controller for all the WCET models, the trace is walked only once
+	if clock is None:
+		sim = MemController(trc, mem, mem_bank, mem_map, wcet)
+		clock = sim.get_WCET()
+
+	if len(wcet_models) == 1:
+		print clock[0]
+	else:
+		print "\n".join(name + " " + str(c) for name, c in zip(wcet_models, clock))
 
 
 